@@ -0,0 +1,137 @@
+"""Benchmark: one check cycle over thousands of simulated accounts, legacy to_list(100) + gather vs registry and worker pool
+
+Each account check is simulated by sleeping --latency-ms, so the numbers show the
+cost of loading, scheduling and fanning out accounts rather than IMAP itself.
+Peak memory is traced per cycle: "cold" includes loading the account registry,
+"warm" does not, so the registry's resident size is reported on its own.
+Uses the MongoDB at MONGO_URL (database zumaflix_bench, dropped afterwards), or
+mongomock-motor with --mongomock (pip install -r benchmarks/requirements.txt).
+
+Usage (from backend/):
+    python -m benchmarks.bench_accounts --accounts 5000 --latency-ms 20 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+# Always the bench database, never DB_NAME from the shell or .env: it is wiped and dropped
+os.environ['DB_NAME'] = 'zumaflix_bench'
+
+import server  # noqa: E402
+
+
+# ---- Baseline: the concurrent check_all_accounts from before the registry and worker pool ----
+# Condensed, not verbatim (stats bookkeeping dropped). The original code before
+# that checked the same to_list(100) accounts one after another.
+
+async def legacy_check_all_accounts():
+    accounts = await server.db.imap_accounts.find({"is_active": True}, {"_id": 0}).to_list(100)
+    config = server.MonitoringConfig(**(await server.db.monitoring_config.find_one({}, {"_id": 0}) or {}))
+    semaphore = asyncio.Semaphore(config.max_concurrent_checks)
+
+    async def check_with_limit(account: dict):
+        async with semaphore:
+            await server.check_netflix_emails_for_account(account, config.auto_click)
+
+    await asyncio.gather(*(check_with_limit(account) for account in accounts), return_exceptions=True)
+
+
+async def seed(count: int, concurrency: int):
+    await server.db.imap_accounts.delete_many({})
+    await server.db.monitoring_config.delete_many({})
+    await server.db.monitoring_config.insert_one(server.MonitoringConfig(max_concurrent_checks=concurrency).model_dump())
+    now = server.datetime.now(server.timezone.utc).isoformat()
+    docs = [{
+        "id": str(uuid.uuid4()), "name": f"bench-{i:05d}", "email": f"bench{i}@example.com", "password": "x" * 16,
+        "imap_server": "imap.example.com", "imap_port": 993, "is_active": True, "created_at": now, "updated_at": now
+    } for i in range(count)]
+    for start in range(0, count, 1000):
+        await server.db.imap_accounts.insert_many(docs[start:start + 1000])
+
+async def measure(cycle, checked: set) -> tuple:
+    """(seconds, accounts checked, peak traced KiB) for one cycle"""
+    checked.clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    await cycle()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, len(checked), peak / 1024
+
+async def pool_cold():
+    server.config_registry.invalidate_accounts()  # Includes loading the accounts into the registry
+    await server.check_all_accounts()
+
+async def registry_resident() -> float:
+    """KiB the account registry keeps between cycles"""
+    server.config_registry.invalidate_accounts()
+    tracemalloc.start()
+    await server.config_registry.accounts()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1024
+
+async def main(args):
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db = AsyncMongoMockClient()[os.environ['DB_NAME']]
+
+    checked = set()
+
+    async def simulated_check(account: dict, auto_click: bool = True):
+        await asyncio.sleep(args.latency_ms / 1000)
+        checked.add(account['id'])
+        return 0
+
+    server.check_netflix_emails_for_account = simulated_check
+    await seed(args.accounts, args.concurrency)
+    try:
+        server.account_leases.ttl = 3600  # One worker leases everything for the whole run
+        await server.account_leases.rebalance([account['id'] async for account in server.stream_accounts({"is_active": True})], set())
+        ideal = args.accounts * args.latency_ms / 1000 / args.concurrency
+
+        print(f"{args.accounts} accounts, {args.latency_ms} ms per check, {args.concurrency} concurrent checks "
+              f"(ideal cycle {ideal:.2f}s)")
+        if args.mongomock:
+            print("note: mongomock ignores to_list()'s length, so legacy checks every account here instead of 100")
+        for label, cycle in (("legacy         ", legacy_check_all_accounts),
+                             ("pool, cold     ", pool_cold)):
+            elapsed, count, peak = await measure(cycle, checked)
+            print(f"{label}: {elapsed:7.2f}s  {count:6d} accounts checked  peak {peak:9.0f} KiB")
+        resident = await registry_resident()
+        elapsed, count, peak = await measure(server.check_all_accounts, checked)
+        print(f"pool, warm     : {elapsed:7.2f}s  {count:6d} accounts checked  peak {peak:9.0f} KiB "
+              f"+ {resident:.0f} KiB resident registry")
+
+        # One scheduler pass as monitoring_loop runs it for every wake-up
+        accounts = await server.config_registry.accounts()
+        config = await server.config_registry.config()
+        scheduler = server.PollingScheduler()
+        now = asyncio.get_running_loop().time()
+        scheduler.sync(accounts, config, now)
+        start = time.perf_counter()
+        for _ in range(10):
+            scheduler.sync(accounts, config, now)
+            scheduler.due(accounts, now)
+            scheduler.seconds_until_next(now)
+        print(f"scheduler pass over {len(accounts)} accounts: {(time.perf_counter() - start) / 10 * 1000:.1f} ms")
+    finally:
+        await server.account_leases.release_all()
+        if not args.mongomock:
+            await server.client.drop_database(os.environ['DB_NAME'])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=5000)
+    parser.add_argument('--latency-ms', type=float, default=20, help="simulated duration of one account check")
+    parser.add_argument('--concurrency', type=int, default=50, help="max_concurrent_checks")
+    parser.add_argument('--mongomock', action='store_true', help="use an in-memory mongomock database")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,114 @@
+"""Microbenchmark: legacy per-call regex classification vs NetflixEmailClassifier
+
+Usage (from backend/):
+    python -m benchmarks.bench_classifier --count 2000 --repeat 5
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'zumaflix_bench')
+
+from server import (  # noqa: E402
+    email_classifier, TEMPORARY_ACCESS_SUBJECT_KEYWORDS, TEMPORARY_ACCESS_BODY_KEYWORDS, HOUSEHOLD_KEYWORDS
+)
+from benchmarks.corpus import build_corpus  # noqa: E402
+
+
+# ---- Legacy implementation (before the classifier), kept verbatim as the baseline ----
+
+def legacy_extract_verification_link(html_content: str) -> Optional[str]:
+    patterns = [
+        r'href=["\']?(https://www\.netflix\.com/account/update-primary-location\?[^"\'>\s]+)["\']?',
+        r'href=["\']?(https://www\.netflix\.com/account/household[^"\'>\s]*)["\']?',
+        r'href=["\']?(https://www\.netflix\.com/[^"\'>\s]*update[^"\'>\s]*location[^"\'>\s]*)["\']?',
+        r'href=["\']?(https://www\.netflix\.com/account/travel/[^"\'>\s]*)["\']?',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, html_content, re.IGNORECASE)
+        if match:
+            return match.group(1)
+    return None
+
+def legacy_extract_access_code(html_content: str) -> Optional[str]:
+    matches = re.findall(r'\b(\d{6})\b', html_content)
+    return matches[0] if matches else None
+
+def legacy_extract_recipient_name(html_content: str) -> str:
+    match = re.search(r'Hi\s+([^,\n<]+)', html_content)
+    return match.group(1).strip() if match else "Unknown"
+
+def legacy_extract_device_info(html_content: str) -> Optional[str]:
+    match = re.search(r'device[^:]*:?\s*([^\n<]+)', html_content, re.IGNORECASE)
+    return match.group(1).strip() if match else None
+
+def legacy_detect_email_type(subject: str, body: str) -> str:
+    subject_lower = subject.lower()
+    body_lower = body.lower()
+    if any(kw in subject_lower for kw in TEMPORARY_ACCESS_SUBJECT_KEYWORDS):
+        return "temporary_access"
+    if any(kw in body_lower for kw in TEMPORARY_ACCESS_BODY_KEYWORDS):
+        return "temporary_access"
+    if any(kw in subject_lower for kw in HOUSEHOLD_KEYWORDS):
+        return "household_update"
+    if any(kw in body_lower for kw in HOUSEHOLD_KEYWORDS):
+        return "household_update"
+    return "other"
+
+def legacy_classify(subject: str, body: str) -> tuple:
+    email_type = legacy_detect_email_type(subject, body)
+    if email_type not in ("household_update", "temporary_access"):
+        return (email_type, "Unknown", None, None, None)
+    return (
+        email_type,
+        legacy_extract_recipient_name(body),
+        legacy_extract_verification_link(body),
+        legacy_extract_access_code(body) if email_type == "temporary_access" else None,
+        legacy_extract_device_info(body) if email_type == "temporary_access" else None,
+    )
+
+def classifier_classify(subject: str, body: str) -> tuple:
+    result = email_classifier.classify(subject, body)
+    return (result.email_type, result.recipient, result.verification_link, result.access_code, result.device_info)
+
+
+def run(func, corpus: list, repeat: int) -> float:
+    """Best-of-repeat messages per second"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for subject, _, html in corpus:
+            func(subject, html)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=2000, help="emails in the corpus")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs; the best one is reported")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.count, args.seed)
+    mismatches = [
+        subject for subject, _, html in corpus
+        if legacy_classify(subject, html) != classifier_classify(subject, html)
+    ]
+    if mismatches:
+        sys.exit(f"Classifier disagrees with the legacy implementation on {len(mismatches)} emails")
+
+    average_kb = sum(len(html) for _, _, html in corpus) / len(corpus) / 1024
+    legacy = run(legacy_classify, corpus, args.repeat)
+    current = run(classifier_classify, corpus, args.repeat)
+    print(f"corpus: {len(corpus)} emails, avg {average_kb:.1f} KiB HTML, results identical")
+    print(f"legacy     : {legacy:10.0f} msg/s")
+    print(f"classifier : {current:10.0f} msg/s  ({current / legacy:.2f}x)")
+
+if __name__ == '__main__':
+    main()
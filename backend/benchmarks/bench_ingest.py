@@ -0,0 +1,187 @@
+"""End-to-end benchmark: check cycles through server.py against a fake IMAP server and a fake Netflix endpoint
+
+Runs the real monitoring path (pooled IMAP sessions, UID search, two-phase
+fetch, classification, click queue, dispatcher, persistence) with:
+  * FakeIMAPServer (benchmarks/fake_imap.py) standing in for imaplib.IMAP4_SSL,
+    seeded with --accounts mailboxes of --messages synthetic emails each
+  * an httpx MockTransport standing in for www.netflix.com, answering each
+    verification link after --click-latency-ms
+  * the MongoDB at MONGO_URL (database zumaflix_bench, dropped afterwards), or
+    mongomock-motor with --mongomock (pip install -r benchmarks/requirements.txt)
+
+Phase 1 is the initial sync of every mailbox. Phase 2 delivers --new-messages
+more emails to each mailbox, including one household email, and runs one more
+cycle; arrival-to-click is measured from delivery to the request reaching the
+fake endpoint, so it excludes the wait for the next poll.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ingest --accounts 100 --messages 30 --new-messages 5 --mongomock
+"""
+import argparse
+import asyncio
+import imaplib
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+# Always the bench database, never DB_NAME from the shell or .env: it is wiped and dropped
+os.environ['DB_NAME'] = 'zumaflix_bench'
+
+import server  # noqa: E402
+from benchmarks.corpus import build_corpus, build_message, household_email  # noqa: E402
+from benchmarks.fake_imap import FakeIMAPServer, FakeMessage  # noqa: E402
+
+
+class FakeNetflix:
+    """Answers verification links after a fixed latency and records when each token arrived"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.clicked_at: dict[str, float] = {}
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.clicked_at.setdefault(request.url.params.get('nftoken'), time.perf_counter())
+        await asyncio.sleep(self.latency)
+        return httpx.Response(200, text="<html>Household updated</html>")
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def token_of(html: str) -> str:
+    return html.split('nftoken=', 1)[1].split('&', 1)[0]
+
+def prepare(corpus: list, rng: random.Random) -> list:
+    return [FakeMessage(build_message(subject, sender, html, rng)) for subject, sender, html in corpus]
+
+async def seed_accounts(count: int, concurrency: int) -> list:
+    await server.db.imap_accounts.delete_many({})
+    await server.db.monitoring_config.delete_many({})
+    await server.db.monitoring_config.insert_one(server.MonitoringConfig(max_concurrent_checks=concurrency).model_dump())
+    now = server.datetime.now(server.timezone.utc).isoformat()
+    accounts = [{
+        "id": str(uuid.uuid4()), "name": f"bench-{i:05d}", "email": f"bench{i}@example.com", "password": "x",
+        "imap_server": "imap.example.com", "imap_port": 993, "is_active": True, "created_at": now, "updated_at": now
+    } for i in range(count)]
+    await server.db.imap_accounts.insert_many([dict(account) for account in accounts])
+    return accounts
+
+async def run_cycle() -> float:
+    """One check cycle over every account, until its email logs are saved"""
+    start = time.perf_counter()
+    await server.check_all_accounts()
+    await server.flush_pending_saves()
+    return time.perf_counter() - start
+
+async def wait_for_clicks(fake_netflix: FakeNetflix, tokens: set, timeout: float = 120):
+    deadline = time.perf_counter() + timeout
+    while not tokens <= fake_netflix.clicked_at.keys() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+
+async def main(args):
+    logging.disable(logging.INFO)
+    if args.mongomock:
+        from mongomock_motor import AsyncMongoMockClient
+        server.db = AsyncMongoMockClient()[os.environ['DB_NAME']]
+    rng = random.Random(args.seed)
+
+    imap = FakeIMAPServer(latency=args.imap_latency_ms / 1000)
+    imaplib.IMAP4_SSL = imap.client_class()
+    fake_netflix = FakeNetflix(args.click_latency_ms / 1000)
+    server.click_dispatcher._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(fake_netflix.handle), follow_redirects=True, headers=server.CLICK_HEADERS
+    )
+
+    # Mailboxes share one prepared backlog; Message-IDs only need to be unique per account
+    build_start = time.perf_counter()
+    accounts = await seed_accounts(args.accounts, args.concurrency)
+    backlog = prepare(build_corpus(args.messages, args.seed), rng)
+    for account in accounts:
+        for message in backlog:
+            imap.deliver(account['email'], message)
+    # New mail is unique per account, with one household email each for latency
+    arrivals = {}
+    for index, account in enumerate(accounts):
+        subject, html = household_email(rng)
+        corpus = [(subject, "Netflix <info@account.netflix.com>", html)]
+        corpus += build_corpus(args.new_messages - 1, args.seed + index + 1) if args.new_messages > 1 else []
+        arrivals[account['email']] = (token_of(html), prepare(corpus, rng))
+    if args.mongomock:
+        print("note: mongomock scans collections linearly and shares the event loop; "
+              "use a real mongod for absolute cycle times and latencies")
+    print(f"{args.accounts} accounts x {args.messages} messages, +{args.new_messages} new each; "
+          f"IMAP {args.imap_latency_ms} ms/command, click {args.click_latency_ms} ms, "
+          f"{args.concurrency} concurrent checks, {args.parse_workers} parse workers "
+          f"({time.perf_counter() - build_start:.1f}s to build)")
+
+    await server.ensure_indexes()
+    server.log_sink.start()
+    server.click_queue.start()
+    server.account_leases.ttl = 3600  # One worker leases everything for the whole run
+    await server.account_leases.rebalance([account['id'] for account in accounts], set())
+    server.parse_stage.workers = args.parse_workers
+    await server.parse_stage.start()
+    try:
+        commands = imap.commands
+        elapsed = await run_cycle()
+        print(f"initial sync : {elapsed:7.2f}s  {args.accounts * args.messages / elapsed:9.0f} msg/s scanned  "
+              f"{imap.commands - commands} IMAP commands  peak RSS {peak_rss_mib():.0f} MiB")
+
+        tokens = set()
+        delivered_at = {}
+        commands = imap.commands
+        for login, (token, messages) in arrivals.items():
+            for message in messages:
+                imap.deliver(login, message)
+            delivered_at[token] = time.perf_counter()
+            tokens.add(token)
+        elapsed = await run_cycle()
+        await wait_for_clicks(fake_netflix, tokens)
+        print(f"new mail     : {elapsed:7.2f}s  {args.accounts * args.new_messages / elapsed:9.0f} msg/s ingested  "
+              f"{imap.commands - commands} IMAP commands  peak RSS {peak_rss_mib():.0f} MiB")
+
+        latencies = [(fake_netflix.clicked_at[token] - delivered_at[token]) * 1000
+                     for token in tokens if token in fake_netflix.clicked_at]
+        if latencies:
+            print(f"arrival->click ({len(latencies)}/{len(tokens)} clicked): "
+                  f"p50 {percentile(latencies, 0.5):.0f} ms  p90 {percentile(latencies, 0.9):.0f} ms  "
+                  f"p99 {percentile(latencies, 0.99):.0f} ms  max {max(latencies):.0f} ms  "
+                  f"mean {statistics.fmean(latencies):.0f} ms")
+        stored = await server.db.email_logs.count_documents({})
+        print(f"email logs stored: {stored}, verification requests: {len(fake_netflix.clicked_at)}")
+    finally:
+        await server.click_queue.stop()
+        await server.click_dispatcher.close()
+        await server.log_sink.stop()
+        await server.imap_pool.close_all()
+        server.parse_stage.close()
+        await server.account_leases.release_all()
+        if not args.mongomock:
+            await server.client.drop_database(os.environ['DB_NAME'])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=100)
+    parser.add_argument('--messages', type=int, default=30, help="emails already in each mailbox")
+    parser.add_argument('--new-messages', type=int, default=5, help="emails delivered to each mailbox for phase 2")
+    parser.add_argument('--imap-latency-ms', type=float, default=5, help="simulated round trip per IMAP command")
+    parser.add_argument('--click-latency-ms', type=float, default=50, help="simulated verification link response time")
+    parser.add_argument('--concurrency', type=int, default=20, help="max_concurrent_checks")
+    parser.add_argument('--parse-workers', type=int, default=server.PARSE_WORKERS, help="parse pool processes (0 = inline)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mongomock', action='store_true', help="use an in-memory mongomock database")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""Microbenchmark: legacy email.message walk vs extract_email_body on messages with inline images
+
+Usage (from backend/):
+    python -m benchmarks.bench_mime --count 500 --image-kb 512 --repeat 3
+"""
+import argparse
+import email
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'zumaflix_bench')
+
+from server import extract_email_body  # noqa: E402
+from benchmarks.corpus import build_messages  # noqa: E402
+
+
+# ---- Legacy implementation (full parse + walk), kept verbatim as the baseline ----
+
+def legacy_get_email_body(msg):
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            content_type = part.get_content_type()
+            if content_type == "text/html":
+                payload = part.get_payload(decode=True)
+                if payload:
+                    body = payload.decode('utf-8', errors='ignore')
+                    break
+            elif content_type == "text/plain" and not body:
+                payload = part.get_payload(decode=True)
+                if payload:
+                    body = payload.decode('utf-8', errors='ignore')
+    else:
+        payload = msg.get_payload(decode=True)
+        if payload:
+            body = payload.decode('utf-8', errors='ignore')
+    return body
+
+def legacy_extract(raw: bytes) -> str:
+    return legacy_get_email_body(email.message_from_bytes(raw))
+
+
+def run(func, messages: list, repeat: int) -> tuple:
+    """(best-of-repeat messages per second, peak traced KiB for one pass)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for raw in messages:
+            func(raw)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    for raw in messages:
+        func(raw)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(messages) / best, peak / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=500, help="messages in the corpus")
+    parser.add_argument('--image-kb', type=int, default=512, help="size of the inline image attached to each message")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs; the best one is reported")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    messages = build_messages(args.count, args.seed, inline_image_bytes=args.image_kb * 1024)
+    mismatches = sum(1 for raw in messages if legacy_extract(raw) != extract_email_body(raw))
+    if mismatches:
+        sys.exit(f"extract_email_body disagrees with the legacy implementation on {mismatches} messages")
+
+    average_kb = sum(len(raw) for raw in messages) / len(messages) / 1024
+    legacy, legacy_peak = run(legacy_extract, messages, args.repeat)
+    current, current_peak = run(extract_email_body, messages, args.repeat)
+    print(f"corpus: {len(messages)} messages, avg {average_kb:.1f} KiB raw, results identical")
+    print(f"legacy  : {legacy:10.0f} msg/s  peak {legacy_peak:10.0f} KiB")
+    print(f"streamed: {current:10.0f} msg/s  peak {current_peak:10.0f} KiB  ({current / legacy:.2f}x)")
+
+if __name__ == '__main__':
+    main()
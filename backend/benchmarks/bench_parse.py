@@ -0,0 +1,72 @@
+"""Benchmark: parse stage inline on the event loop vs a process pool, throughput and event-loop lag
+
+A backlog of --accounts checks, each with --per-account fetched emails, is parsed
+concurrently through ParseStage. A 5 ms ticker runs alongside and records how
+late it wakes up, which is how long an API request would wait.
+
+Usage (from backend/):
+    python -m benchmarks.bench_parse --accounts 40 --per-account 30 --workers 0 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'zumaflix_bench')
+
+from server import ParseStage  # noqa: E402
+from benchmarks.corpus import build_corpus, build_messages  # noqa: E402
+
+TICK = 0.005
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(0.0, loop.time() - expected))
+
+async def run(workers: int, batches: list) -> tuple:
+    """(messages per second, max loop lag ms, p99 loop lag ms)"""
+    stage = ParseStage(workers)
+    await stage.start()
+    try:
+        stop, lags = asyncio.Event(), []
+        tick_task = asyncio.create_task(ticker(stop, lags))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(stage.parse(batch) for batch in batches))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await tick_task
+    finally:
+        stage.close()
+    assert sum(len(records) for records in results) == sum(len(batch) for batch in batches)
+    lags.sort()
+    return sum(len(batch) for batch in batches) / elapsed, lags[-1] * 1000, lags[int(len(lags) * 0.99)] * 1000
+
+async def main(args):
+    count = args.accounts * args.per_account
+    subjects = [subject for subject, _, _ in build_corpus(count, args.seed)]
+    items = [(subject, raw, None, None) for subject, raw in zip(subjects, build_messages(count, args.seed))]
+    batches = [items[start:start + args.per_account] for start in range(0, count, args.per_account)]
+
+    print(f"{count} emails in {len(batches)} checks of {args.per_account}, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        rate, max_lag, p99_lag = await run(workers, batches)
+        baseline = baseline or rate
+        label = "inline" if workers == 0 else f"{workers} workers"
+        print(f"{label:>10}: {rate:8.0f} msg/s ({rate / baseline:.2f}x)  loop lag max {max_lag:7.1f} ms  p99 {p99_lag:7.1f} ms")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=40, help="concurrent checks in the backlog")
+    parser.add_argument('--per-account', type=int, default=30, help="emails fetched per check")
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4], help="pool sizes to compare (0 = inline)")
+    parser.add_argument('--seed', type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
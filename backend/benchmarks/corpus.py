@@ -0,0 +1,115 @@
+"""Synthetic but realistic Netflix (and non-Netflix) emails for benchmarks"""
+import random
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+from datetime import datetime, timedelta, timezone
+
+NAMES = ["CK", "Aisyah", "Daniel", "Mei Ling", "Raj", "Zoë", "Hafiz", "Sarah"]
+DEVICES = ["Android TV", "Samsung Smart TV", "Apple TV 4K", "Chrome on Windows", "iPhone 15", "PlayStation 5"]
+
+# Netflix mails are mostly layout: nested tables with long inline styles
+ROW_TEMPLATE = (
+    '<tr><td align="left" class="copy lrg-number regular component-copy" '
+    'style="font-family:Netflix Sans,Helvetica,Roboto,Segoe UI,sans-serif;font-weight:400;'
+    'font-size:14px;line-height:20px;color:#221f1f;padding-top:20px">{text}</td></tr>\n'
+)
+FILLER_TEXT = [
+    "Questions? Visit the Help Center.",
+    "This message was mailed to you as part of your Netflix membership.",
+    "Netflix Services, Inc. may send you service-related emails.",
+    "Update your email preferences to choose which emails you get from Netflix.",
+    "SRC: 1234_en-US_MY",
+    "Terms of Use | Privacy | Help Center",
+]
+
+def _layout(rows: list, rng: random.Random, padding_rows: int) -> str:
+    filler = [ROW_TEMPLATE.format(text=rng.choice(FILLER_TEXT)) for _ in range(padding_rows)]
+    half = len(filler) // 2
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><style>'
+        '.copy{font-family:Helvetica}.button{background-color:#e50914}</style></head>'
+        '<body style="margin:0;padding:0;background-color:#f3f3f3">'
+        '<table width="100%" cellpadding="0" cellspacing="0" border="0">'
+        '<tr><td><img src="https://assets.nflxext.com/us/email/gem/nflx.png" alt="Netflix"></td></tr>\n'
+        + ''.join(filler[:half])
+        + ''.join(ROW_TEMPLATE.format(text=row) for row in rows)
+        + ''.join(filler[half:])
+        + '</table></body></html>'
+    )
+
+def household_email(rng: random.Random, padding_rows: int = 120) -> tuple:
+    token = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789') for _ in range(48))
+    link = f"https://www.netflix.com/account/update-primary-location?nftoken={token}&g=0a1b2c&lnktrk=EVO"
+    rows = [
+        f"Hi {rng.choice(NAMES)},",
+        "Did you request to update your Netflix Household?",
+        f'<a href="{link}" class="button" style="color:#ffffff;text-decoration:none">Yes, This Was Me</a>',
+        "This link will expire in 15 minutes.",
+    ]
+    return "Important: How to update your Netflix Household", _layout(rows, rng, padding_rows)
+
+def temporary_access_email(rng: random.Random, padding_rows: int = 120) -> tuple:
+    code = f"{rng.randrange(10**6):06d}"
+    rows = [
+        f"Hi {rng.choice(NAMES)},",
+        "You requested a temporary access code. Use it to watch Netflix on this device.",
+        f"Requested by device: {rng.choice(DEVICES)}",
+        f'<span style="font-size:36px;letter-spacing:6px">{code}</span>',
+        '<a href="https://www.netflix.com/account/travel/verify?nftoken=abc">Get a temporary access code</a>',
+    ]
+    return "Your Netflix temporary access code", _layout(rows, rng, padding_rows)
+
+def marketing_email(rng: random.Random, padding_rows: int = 160) -> tuple:
+    rows = [
+        f"Hi {rng.choice(NAMES)},",
+        "New arrivals you might like this week.",
+        '<a href="https://www.netflix.com/title/81234567">Watch now</a>',
+        '<a href="https://www.netflix.com/browse">Browse</a>',
+    ]
+    return "New on Netflix: Top picks for you", _layout(rows, rng, padding_rows)
+
+def non_netflix_email(rng: random.Random, padding_rows: int = 80) -> tuple:
+    rows = [f"Hi {rng.choice(NAMES)},", "Your order has shipped.", '<a href="https://shop.example.com/track">Track</a>']
+    return "Your order is on its way", _layout(rows, rng, padding_rows)
+
+# Weighted mix seen on a typical monitored inbox
+EMAIL_MIX = [
+    (household_email, 3, "Netflix <info@account.netflix.com>"),
+    (temporary_access_email, 2, "Netflix <info@account.netflix.com>"),
+    (marketing_email, 4, "Netflix <info@mailer.netflix.com>"),
+    (non_netflix_email, 1, "Shop <orders@shop.example.com>"),
+]
+
+def build_corpus(count: int, seed: int = 42) -> list:
+    """(subject, sender, html) tuples in the EMAIL_MIX proportions"""
+    rng = random.Random(seed)
+    builders = [entry for entry in EMAIL_MIX for _ in range(entry[1])]
+    corpus = []
+    for _ in range(count):
+        builder, _, sender = rng.choice(builders)
+        subject, html = builder(rng)
+        corpus.append((subject, sender, html))
+    return corpus
+
+def build_message(subject: str, sender: str, html: str, rng: random.Random,
+                  received_at: datetime = None, inline_image_bytes: int = 0) -> bytes:
+    """Full MIME message: text/plain + text/html alternative, optional inline image"""
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = "member@example.com"
+    msg['Message-ID'] = make_msgid(domain="netflix.com")
+    msg['Date'] = format_datetime(received_at or datetime.now(timezone.utc) - timedelta(minutes=rng.randrange(60)))
+    msg.set_content("Please view this email in an HTML capable client.")
+    msg.add_alternative(html, subtype='html')
+    if inline_image_bytes:
+        msg.add_attachment(rng.randbytes(inline_image_bytes), maintype='image', subtype='png', filename='hero.png')
+    return msg.as_bytes()
+
+def build_messages(count: int, seed: int = 42, inline_image_bytes: int = 0) -> list:
+    """Raw RFC 822 bytes for build_corpus(count, seed)"""
+    rng = random.Random(seed)
+    return [
+        build_message(subject, sender, html, rng, inline_image_bytes=inline_image_bytes)
+        for subject, sender, html in build_corpus(count, seed)
+    ]
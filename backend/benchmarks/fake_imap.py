@@ -0,0 +1,178 @@
+"""In-process stand-in for imaplib.IMAP4_SSL, serving synthetic mailboxes
+
+Covers what the monitoring path sends: LOGIN, SELECT, CAPABILITY, NOOP, LOGOUT,
+UID SEARCH (UID ranges, with any further criteria taken to mean "from Netflix")
+and UID FETCH of UID/INTERNALDATE/BODYSTRUCTURE/header fields, partial body
+sections and BODY[]. Responses have imaplib's shape so server.py parses them
+exactly as it would a real server's. Every command sleeps `latency` seconds on
+the calling (IMAP pool) thread to stand in for the network round trip.
+"""
+import email
+import imaplib
+import re
+import threading
+import time
+from email import policy
+
+HEADER_NAMES = ('Subject', 'From', 'Message-ID', 'Date')
+
+
+def _bodystructure(part) -> str:
+    if part.is_multipart():
+        children = ''.join(_bodystructure(child) for child in part.get_payload())
+        return f'({children} "{part.get_content_subtype().upper()}" ("BOUNDARY" "{part.get_boundary()}") NIL NIL)'
+    charset = part.get_content_charset()
+    params = f'("CHARSET" "{charset}")' if charset else 'NIL'
+    encoding = (part.get('Content-Transfer-Encoding') or '7bit').upper()
+    size = len(part.get_payload().encode())
+    return (f'("{part.get_content_maintype().upper()}" "{part.get_content_subtype().upper()}" '
+            f'{params} NIL NIL "{encoding}" {size} 1 NIL NIL NIL NIL)')
+
+def _sections(message, prefix: str = '') -> dict:
+    """Encoded payload of every leaf part, keyed by IMAP section path"""
+    if not message.is_multipart():
+        return {prefix or '1': message.get_payload().encode()}
+    sections = {}
+    for index, child in enumerate(message.get_payload(), 1):
+        sections.update(_sections(child, f'{prefix}.{index}' if prefix else str(index)))
+    return sections
+
+
+class FakeMessage:
+    """A message prepared once; everything FETCH returns is precomputed"""
+
+    def __init__(self, raw: bytes, internaldate: float = None):
+        message = email.message_from_bytes(raw, policy=policy.compat32)
+        self.raw = raw
+        self.from_netflix = 'netflix' in (message['From'] or '').lower()
+        self.header = ''.join(f'{name}: {message[name]}\r\n' for name in HEADER_NAMES if message[name]).encode() + b'\r\n'
+        self.bodystructure = _bodystructure(message)
+        self.sections = _sections(message)
+        self.internaldate = time.strftime('%d-%b-%Y %H:%M:%S +0000', time.gmtime(internaldate or time.time()))
+
+
+class FakeIMAPServer:
+    """Mailboxes keyed by login; deliver() may run while clients are connected"""
+
+    uidvalidity = 1
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.mailboxes: dict[str, list] = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+
+    def deliver(self, login: str, message: FakeMessage) -> int:
+        """Append a message; returns its UID"""
+        mailbox = self.mailboxes.setdefault(login, [])
+        mailbox.append(message)
+        return len(mailbox)
+
+    def client_class(self):
+        """An IMAP4_SSL replacement bound to this server"""
+        server = self
+
+        class FakeIMAP4(FakeIMAP4Client):
+            def __init__(self, host='', port=993, timeout=None, **kwargs):
+                super().__init__(server)
+
+        return FakeIMAP4
+
+    def _round_trip(self):
+        with self._lock:
+            self.commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeIMAP4Client:
+    error = imaplib.IMAP4.error
+    abort = imaplib.IMAP4.abort
+
+    def __init__(self, server: FakeIMAPServer):
+        self.server = server
+        self.mailbox = None
+        server._round_trip()  # Connect and greeting
+
+    def login(self, user, password):
+        self.server._round_trip()
+        self.mailbox = self.server.mailboxes.setdefault(user, [])
+        return 'OK', [b'LOGIN completed']
+
+    def capability(self):
+        self.server._round_trip()
+        return 'OK', [b'IMAP4rev1 UIDPLUS']
+
+    def select(self, mailbox='INBOX'):
+        self.server._round_trip()
+        return 'OK', [str(len(self.mailbox)).encode()]
+
+    def response(self, code):
+        return code, [str(self.server.uidvalidity).encode()] if code == 'UIDVALIDITY' else [None]
+
+    def noop(self):
+        self.server._round_trip()
+        return 'OK', [b'NOOP completed']
+
+    def logout(self):
+        self.server._round_trip()
+        return 'BYE', [b'LOGOUT']
+
+    def shutdown(self):
+        pass
+
+    def uid(self, command, *args):
+        self.server._round_trip()
+        if command.upper() == 'SEARCH':
+            return 'OK', [' '.join(map(str, self._search(args))).encode()]
+        if command.upper() == 'FETCH':
+            return 'OK', self._fetch(args[0], args[1])
+        raise self.error(f'UID {command} not supported by FakeIMAP4')
+
+    def _search(self, criteria) -> list:
+        uids = list(range(1, len(self.mailbox) + 1))
+        criteria = list(criteria)
+        if criteria and criteria[0] == 'UID':
+            low, _, high = criteria[1].partition(':')
+            if low == '*':
+                uids = uids[-1:]
+            else:
+                selected = [uid for uid in uids if uid >= int(low)] if high else [uid for uid in uids if uid == int(low)]
+                # "n:*" always matches the highest UID, as on a real server
+                uids = selected or (uids[-1:] if high == '*' else [])
+            criteria = criteria[2:]
+        if criteria:
+            uids = [uid for uid in uids if self.mailbox[uid - 1].from_netflix]
+        return uids
+
+    def _fetch(self, uid_set: str, items: str) -> list:
+        uids = []
+        for part in uid_set.split(','):
+            low, _, high = part.partition(':')
+            uids.extend(range(int(low), int(high or low) + 1))
+        section = re.search(r'BODY\.PEEK\[([\d.]+)\](?:<0\.(\d+)>)?', items)
+        response = []
+        for sequence, uid in enumerate(uids, 1):
+            if uid > len(self.mailbox):
+                continue
+            message = self.mailbox[uid - 1]
+            if 'BODYSTRUCTURE' in items:
+                fields = re.search(r'BODY\.PEEK\[(HEADER\.FIELDS \([^)]*\))\]', items).group(1)
+                response.append((
+                    f'{sequence} (UID {uid} INTERNALDATE "{message.internaldate}" BODYSTRUCTURE '
+                    f'{message.bodystructure} BODY[{fields}] {{{len(message.header)}}}'.encode(),
+                    message.header
+                ))
+                response.append(b')')
+            elif section:
+                path, cap = section.group(1), section.group(2)
+                data = message.sections.get(path, b'')
+                if cap:
+                    data = data[:int(cap)]
+                origin = '<0>' if cap else ''
+                response.append((f'{sequence} (BODY[{path}]{origin} {{{len(data)}}}'.encode(), data))
+                response.append(f' UID {uid})'.encode())
+            else:
+                response.append((f'{sequence} (UID {uid} BODY[] {{{len(message.raw)}}}'.encode(), message.raw))
+                response.append(b')')
+        return response
@@ -1,21 +1,41 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import List, Literal, Optional
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import imaplib
-import email
+import select
+import signal
 from email.header import decode_header
+from email.parser import BytesHeaderParser
+import base64
+import quopri
+import itertools
 import re
+import json
+import random
+import math
+import socket
 import httpx
 import asyncio
+import functools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 import secrets
 import hashlib
@@ -39,10 +59,95 @@ logger = logging.getLogger(__name__)
 ADMIN_USERNAME = "AdminZuma"
 ADMIN_PASSWORD = "Zuma2925!"
 
-# Global monitoring state
+# This worker's copy of the cluster-wide monitoring flag (cluster_state in MongoDB)
 monitoring_task = None
 is_monitoring = False
 
+# Workers split active accounts between them through leases that expire unless renewed
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+LEASE_TTL = int(os.environ.get('LEASE_TTL', '15'))  # Seconds before a silent worker's accounts are taken over
+LEASE_RENEW_INTERVAL = LEASE_TTL / 3
+
+# IMAP I/O runs on a bounded thread pool so mailbox reads never block the event loop
+IMAP_MAX_WORKERS = int(os.environ.get('IMAP_MAX_WORKERS', '20'))
+IMAP_TIMEOUT = float(os.environ.get('IMAP_TIMEOUT', '30'))
+imap_executor = ThreadPoolExecutor(max_workers=IMAP_MAX_WORKERS, thread_name_prefix="imap")
+IMAP_KEEPALIVE_INTERVAL = int(os.environ.get('IMAP_KEEPALIVE_INTERVAL', '240'))
+MAX_RESYNC_EMAILS = 30  # Newest Netflix emails processed when an account is (re)synced from scratch
+MAX_EMAIL_ATTEMPTS = int(os.environ.get('MAX_EMAIL_ATTEMPTS', '3'))  # Checks an email may fail before it is skipped
+FETCH_BATCH_SIZE = 50  # UIDs per FETCH command
+ACCOUNT_BATCH_SIZE = 500  # Accounts per cursor batch when reading imap_accounts into the registry
+
+# IDLE sessions block a thread each for minutes at a time, so they get their own pool
+IMAP_MAX_IDLE_SESSIONS = int(os.environ.get('IMAP_MAX_IDLE_SESSIONS', '100'))
+IMAP_IDLE_TIMEOUT = int(os.environ.get('IMAP_IDLE_TIMEOUT', '540'))  # Re-issue IDLE well before the 29 min limit
+idle_executor = ThreadPoolExecutor(max_workers=IMAP_MAX_IDLE_SESSIONS, thread_name_prefix="imap-idle")
+
+# Processes that decode and classify fetched bodies; 0 keeps that work on the event loop
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', '0'))
+
+# Activity logs are buffered and written in batches, then expire after the retention period
+LOG_RETENTION_DAYS = int(os.environ.get('LOG_RETENTION_DAYS', '30'))
+LOG_RETENTION_SECONDS = LOG_RETENTION_DAYS * 24 * 3600
+LOG_BUFFER_SIZE = 5000  # Entries waiting to be written before add_log blocks
+LOG_FLUSH_SIZE = 100
+LOG_FLUSH_INTERVAL = 1.0  # Seconds
+
+# ============ Metrics ============
+
+# Stages of an account check on zumaflix_stage_duration_seconds. Histograms are per
+# stage only; per-account series are single gauges and counters, so thousands of
+# accounts stay cheap to scrape.
+METRIC_STAGES = [
+    "login", "sync_state", "probe", "search", "fetch_headers", "dedup",
+    "fetch_bodies", "parse", "save", "click", "check"
+]
+
+stage_duration = Histogram(
+    'zumaflix_stage_duration_seconds', 'Time spent in each stage of an account check',
+    ['stage'], buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+for _stage in METRIC_STAGES:
+    stage_duration.labels(_stage)  # Export every stage from the start, so rate() sees the first observation
+account_last_check_duration = Gauge(
+    'zumaflix_account_last_check_seconds', 'Duration of the most recent check of each account', ['account']
+)
+account_check_failures = Counter(
+    'zumaflix_account_check_failures_total', 'Failed checks of each account', ['account']
+)
+cycle_duration = Histogram(
+    'zumaflix_check_cycle_duration_seconds', 'Time to check all active accounts once',
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+arrival_to_click = Histogram(
+    'zumaflix_arrival_to_click_seconds', 'From an email reaching the mailbox (INTERNALDATE) to its link being clicked',
+    buckets=(1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+)
+detected_to_click = Histogram(
+    'zumaflix_detected_to_click_seconds', 'From link extraction to click completion',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+log_write_duration = Histogram('zumaflix_activity_log_write_seconds', 'Time to store one batch of activity log entries')
+log_buffer_depth = Gauge('zumaflix_activity_log_buffer_depth', 'Activity log entries waiting to be written')
+emails_processed_total = Counter('zumaflix_emails_processed_total', 'Netflix emails classified', ['email_type'])
+clicks_total = Counter('zumaflix_clicks_total', 'Verification link clicks', ['outcome'])
+click_queue_depth = Gauge('zumaflix_click_queue_depth', 'Household links waiting for a click worker')
+pending_saves_depth = Gauge('zumaflix_pending_saves', 'Account checks whose results are still being saved')
+event_subscribers = Gauge('zumaflix_event_subscribers', 'Open /api/events streams')
+leased_accounts = Gauge('zumaflix_leased_accounts', 'Accounts leased by this worker')
+
+def stage_timer(stage: str):
+    """Context manager observing one stage of an account check"""
+    return stage_duration.labels(stage).time()
+
+def forget_account_metrics(name: str):
+    """Drop per-account series for a deleted or renamed account"""
+    for metric in (account_last_check_duration, account_check_failures):
+        try:
+            metric.remove(name)
+        except KeyError:
+            pass
+
 # Security
 security = HTTPBasic()
 
@@ -60,9 +165,34 @@ def verify_admin(credentials: HTTPBasicCredentials = Depends(security)):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting Netflix Household Automation Service")
+    await ensure_log_retention()
+    await ensure_indexes()
+    await ensure_stats_counters()
+    log_sink.start()
+    click_dispatcher.start()
+    click_queue.start()
+    config_registry.start()
+    await parse_stage.start()
+    keepalive_task = asyncio.create_task(imap_keepalive_loop())
+    cluster_task = asyncio.create_task(cluster_loop())  # Also resumes monitoring if the cluster has it on
     yield
-    global is_monitoring
-    is_monitoring = False
+    cluster_task.cancel()
+    follow_monitoring_state(False)
+    event_broker.close()
+    keepalive_task.cancel()
+    await imap_pool.close_all()
+    await flush_pending_saves()
+    try:
+        await account_leases.release_all()
+    except Exception as e:
+        logger.error(f"Could not release account leases: {e}")
+    await click_queue.stop()
+    await config_registry.stop()
+    await click_dispatcher.close()
+    await log_sink.stop()
+    imap_executor.shutdown(wait=False, cancel_futures=True)
+    idle_executor.shutdown(wait=False, cancel_futures=True)
+    parse_stage.close()
     client.close()
 
 # Create the main app
@@ -83,6 +213,8 @@ class IMAPAccount(BaseModel):
     imap_server: str = "imap.gmail.com"
     imap_port: int = 993
     is_active: bool = True
+    polling_interval: Optional[int] = Field(default=None, ge=5)  # Overrides MonitoringConfig.polling_interval
+    hot_polling_interval: Optional[int] = Field(default=None, ge=5)  # Overrides MonitoringConfig.hot_polling_interval
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -93,6 +225,8 @@ class IMAPAccountCreate(BaseModel):
     imap_server: str = "imap.gmail.com"
     imap_port: int = 993
     is_active: bool = True
+    polling_interval: Optional[int] = Field(default=None, ge=5)
+    hot_polling_interval: Optional[int] = Field(default=None, ge=5)
 
 class IMAPAccountResponse(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -102,6 +236,8 @@ class IMAPAccountResponse(BaseModel):
     imap_server: str
     imap_port: int
     is_active: bool
+    polling_interval: Optional[int] = None
+    hot_polling_interval: Optional[int] = None
     created_at: str
     updated_at: str
 
@@ -109,6 +245,11 @@ class MonitoringConfig(BaseModel):
     model_config = ConfigDict(extra="ignore")
     polling_interval: int = 60
     auto_click: bool = True
+    max_concurrent_checks: int = Field(default=10, ge=1, le=100)  # Accounts polled in parallel
+    monitoring_mode: Literal["polling", "idle"] = "polling"  # "idle" = IMAP IDLE push, polling as fallback
+    hot_polling_interval: int = Field(default=10, ge=5)  # Used for a while after a household or access-code email
+    hot_mode_duration: int = Field(default=900, ge=60)  # Household links expire after 15 minutes
+    max_backoff_interval: int = Field(default=1800, ge=60)  # Ceiling for a repeatedly failing account
 
 class EmailLog(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -125,9 +266,19 @@ class EmailLog(BaseModel):
     device_info: Optional[str] = None
     status: str = "detected"  # detected, clicked, expired, error
     click_response: Optional[str] = None
+    click_latency_ms: Optional[float] = None  # Time spent clicking, including retries
+    detected_to_clicked_ms: Optional[float] = None  # From link extraction to click completion
     processed_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     raw_body: Optional[str] = None
 
+class Page(BaseModel):
+    items: List[dict]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page; None on the last one
+
+class AccountPage(BaseModel):
+    items: List[IMAPAccountResponse]
+    next_cursor: Optional[str] = None
+
 class MonitoringStatus(BaseModel):
     is_running: bool
     last_check: Optional[str] = None
@@ -151,17 +302,223 @@ class LoginResponse(BaseModel):
     token: Optional[str] = None
     message: str
 
-# Global stats
-stats = {
-    "last_check": None,
-    "emails_processed": 0,
-    "links_clicked": 0,
-    "errors": 0
-}
-
 # Session tokens (simple in-memory for this use case)
 active_sessions = {}
 
+class MessageIdCache:
+    """LRU of (account_id, message_id) pairs already stored or known to be irrelevant"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+
+    def __contains__(self, key: tuple) -> bool:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return True
+        return False
+
+    def add(self, key: tuple):
+        self._entries[key] = None
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+seen_message_ids = MessageIdCache(int(os.environ.get('SEEN_MESSAGE_CACHE_SIZE', '10000')))
+
+class EmailPageCache:
+    """Serialized /api/emails pages keyed by query string, dropped whenever email_logs changes
+    
+    Each entry carries a strong ETag (a hash of the body), so clients can
+    revalidate with If-None-Match across invalidations and server restarts.
+    """
+    
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.version = 0  # Bumped on every invalidation
+        self._entries: OrderedDict = OrderedDict()
+    
+    def get(self, key: tuple) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def put(self, key: tuple, version: int, body: bytes) -> tuple:
+        """Cache body unless email_logs changed since version was read; returns (body, etag)"""
+        entry = (body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        if version == self.version:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+    
+    def invalidate(self):
+        self.version += 1
+        self._entries.clear()
+
+email_page_cache = EmailPageCache()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+# ============ Database Indexes ============
+
+INDEX_SPECS = {
+    "email_logs": [
+        # One log per mailbox message; lets concurrent checks upsert without duplicates
+        IndexModel(
+            [("account_id", ASCENDING), ("message_id", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"message_id": {"$gt": ""}},
+            name="account_message_unique"
+        ),
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Keyset pagination: (processed_at, id) with each equality filter as a prefix
+        IndexModel([("processed_at", DESCENDING), ("id", DESCENDING)], name="processed_at_id_desc"),
+        IndexModel([("email_type", ASCENDING), ("processed_at", DESCENDING), ("id", DESCENDING)], name="email_type_processed_at_id"),
+        IndexModel([("account_id", ASCENDING), ("processed_at", DESCENDING), ("id", DESCENDING)], name="account_processed_at_id"),
+        IndexModel([("status", ASCENDING), ("processed_at", DESCENDING), ("id", DESCENDING)], name="status_processed_at_id"),
+    ],
+    "logs": [
+        IndexModel([("timestamp", DESCENDING), ("id", DESCENDING)], name="timestamp_id_desc"),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=LOG_RETENTION_SECONDS),
+    ],
+    "imap_accounts": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("is_active", ASCENDING)], name="is_active"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id_desc"),
+    ],
+    "imap_sync_state": [
+        IndexModel([("account_id", ASCENDING)], unique=True, name="account_id_unique"),
+    ],
+    # Leases and heartbeats are only trusted while unexpired; the TTL monitor tidies up after dead workers
+    "account_leases": [
+        IndexModel([("owner", ASCENDING)], name="owner"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "workers": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+async def ensure_log_retention():
+    """Backfill the TTL date on older log entries and apply a changed LOG_RETENTION_DAYS"""
+    try:
+        ttl_index = (await db.logs.index_information()).get("created_at_ttl")
+        if ttl_index and ttl_index.get("expireAfterSeconds") != LOG_RETENTION_SECONDS:
+            await db.command("collMod", "logs", index={"name": "created_at_ttl", "expireAfterSeconds": LOG_RETENTION_SECONDS})
+            logger.info(f"Activity log retention set to {LOG_RETENTION_DAYS} days")
+        await db.logs.update_many(
+            {"created_at": {"$exists": False}},
+            [{"$set": {"created_at": {"$toDate": "$timestamp"}}}]
+        )
+    except Exception as e:
+        logger.error(f"Could not update activity log retention: {e}")
+
+async def ensure_indexes():
+    """Create the declared indexes and report any that are missing afterwards"""
+    for collection_name, models in INDEX_SPECS.items():
+        collection = db[collection_name]
+        try:
+            await collection.create_indexes(models)
+        except Exception as e:
+            logger.error(f"Index creation failed for {collection_name}: {e}")
+        
+        existing = await collection.index_information()
+        missing = [model.document['name'] for model in models if model.document['name'] not in existing]
+        if missing:
+            logger.warning(f"{collection_name} is missing indexes: {', '.join(missing)}")
+        else:
+            logger.info(f"{collection_name} indexes verified ({len(models)} declared)")
+
+
+# ============ Stats Counters ============
+
+# A single document holds every dashboard counter so /api/stats is one indexed read.
+# Email-log counters mirror email_logs (rebuilt when it is cleared); monitor.* counters
+# are lifetime totals of the monitoring process.
+STATS_ID = "stats"
+EMAIL_LOG_COUNTERS = ["total_emails", "links_clicked", "errors", "household_emails", "access_code_emails"]
+MONITOR_COUNTERS = ["emails_processed", "links_clicked", "errors"]
+
+def email_log_increments(docs: List[dict]) -> dict:
+    """Counter deltas for newly stored email logs"""
+    increments = {"total_emails": len(docs), "monitor.emails_processed": len(docs)}
+    for doc in docs:
+        if doc['status'] == "clicked":
+            increments["links_clicked"] = increments.get("links_clicked", 0) + 1
+            increments["monitor.links_clicked"] = increments.get("monitor.links_clicked", 0) + 1
+        elif doc['status'] == "error":
+            increments["errors"] = increments.get("errors", 0) + 1
+            increments["monitor.errors"] = increments.get("monitor.errors", 0) + 1
+        if doc['email_type'] == "household_update":
+            increments["household_emails"] = increments.get("household_emails", 0) + 1
+        elif doc['email_type'] == "temporary_access":
+            increments["access_code_emails"] = increments.get("access_code_emails", 0) + 1
+    return increments
+
+async def increment_stats(increments: dict, **fields):
+    """Atomically bump counters (and optionally set fields) on the stats document"""
+    update = {}
+    if increments:
+        update["$inc"] = increments
+    if fields:
+        update["$set"] = fields
+    await db.stats_counters.update_one({"_id": STATS_ID}, update, upsert=True)
+    event_broker.stats_changed()
+
+async def email_logs_changed(increments: Optional[dict] = None):
+    """Drop cached /api/emails pages here and, through email_logs_version, on every other worker"""
+    email_page_cache.invalidate()
+    await increment_stats({**(increments or {}), "email_logs_version": 1})
+
+async def rebuild_email_log_counters():
+    """Recompute the email-log counters with a single $facet aggregation"""
+    pipeline = [{"$facet": {
+        "total": [{"$count": "n"}],
+        "by_status": [{"$group": {"_id": "$status", "n": {"$sum": 1}}}],
+        "by_type": [{"$group": {"_id": "$email_type", "n": {"$sum": 1}}}],
+    }}]
+    result = (await db.email_logs.aggregate(pipeline).to_list(1))[0]
+    by_status = {group['_id']: group['n'] for group in result['by_status']}
+    by_type = {group['_id']: group['n'] for group in result['by_type']}
+    await db.stats_counters.update_one({"_id": STATS_ID}, {"$set": {
+        "total_emails": result['total'][0]['n'] if result['total'] else 0,
+        "links_clicked": by_status.get("clicked", 0),
+        "errors": by_status.get("error", 0),
+        "household_emails": by_type.get("household_update", 0),
+        "access_code_emails": by_type.get("temporary_access", 0),
+    }}, upsert=True)
+
+async def ensure_stats_counters():
+    """Seed the counters document from existing data on first start"""
+    counters = await db.stats_counters.find_one({"_id": STATS_ID})
+    if not counters or any(name not in counters for name in EMAIL_LOG_COUNTERS):
+        logger.info("Building stats counters from email_logs")
+        await rebuild_email_log_counters()
+
+async def get_stats_counters() -> dict:
+    counters = await db.stats_counters.find_one({"_id": STATS_ID}, {"_id": 0}) or {}
+    monitor = counters.get("monitor", {})
+    return {
+        **{name: counters.get(name, 0) for name in EMAIL_LOG_COUNTERS},
+        "monitor": {
+            **{name: monitor.get(name, 0) for name in MONITOR_COUNTERS},
+            "last_check": monitor.get("last_check")
+        }
+    }
+
 
 # ============ Auth Functions ============
 
@@ -177,13 +534,263 @@ def hash_token(token: str) -> str:
 def connect_imap(config: dict):
     """Connect to IMAP server"""
     try:
-        mail = imaplib.IMAP4_SSL(config['imap_server'], config['imap_port'])
+        mail = imaplib.IMAP4_SSL(config['imap_server'], config['imap_port'], timeout=IMAP_TIMEOUT)
         mail.login(config['email'], config['password'])
         return mail
     except Exception as e:
         logger.error(f"IMAP connection error: {e}")
         raise
 
+class AsyncIMAPClient:
+    """Async wrapper that runs blocking imaplib calls on the IMAP thread pool"""
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.mail: Optional[imaplib.IMAP4_SSL] = None
+        self.uidvalidity: Optional[int] = None
+        self._capabilities: Optional[set] = None
+        self.last_used = time.monotonic()
+
+    async def _run(self, func, *args, executor: ThreadPoolExecutor = imap_executor):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(executor, functools.partial(func, *args))
+        finally:
+            self.last_used = time.monotonic()
+
+    async def connect(self):
+        self.mail = await self._run(connect_imap, self.config)
+        return self
+
+    async def select(self, mailbox: str = 'INBOX'):
+        result = await self._run(self.mail.select, mailbox)
+        _, data = self.mail.response('UIDVALIDITY')
+        self.uidvalidity = int(data[0]) if data and data[0] else None
+        return result
+
+    async def search(self, *criteria):
+        return await self._run(self.mail.search, None, *criteria)
+
+    async def fetch(self, message_set, message_parts: str):
+        return await self._run(self.mail.fetch, message_set, message_parts)
+
+    async def uid(self, command: str, *args):
+        return await self._run(self.mail.uid, command, *args)
+
+    async def uid_search(self, *criteria) -> List[int]:
+        _, data = await self.uid('SEARCH', *criteria)
+        return [int(uid) for uid in data[0].split()] if data and data[0] else []
+
+    async def noop(self):
+        return await self._run(self.mail.noop)
+
+    async def capabilities(self) -> set:
+        """Post-login capabilities, fetched once per connection"""
+        if self._capabilities is None:
+            _, data = await self._run(self.mail.capability)
+            self._capabilities = set(data[0].decode().upper().split()) if data and data[0] else set()
+        return self._capabilities
+
+    async def idle(self, timeout: float = IMAP_IDLE_TIMEOUT) -> bool:
+        """Wait in IMAP IDLE; True when the server announced new mail"""
+        try:
+            return await self._run(imap_idle_wait, self.mail, timeout, executor=idle_executor)
+        except asyncio.CancelledError:
+            # The IDLE thread is still blocked on the socket; closing it unblocks the thread
+            self.abort()
+            raise
+
+    def abort(self):
+        """Drop the connection without a LOGOUT round trip"""
+        if self.mail is None:
+            return
+        try:
+            self.mail.shutdown()
+        except Exception:
+            pass
+        self.mail = None
+
+    async def logout(self):
+        if self.mail is None:
+            return
+        try:
+            await self._run(self.mail.logout)
+        except Exception as e:
+            logger.debug(f"IMAP logout error: {e}")
+        finally:
+            self.mail = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.logout()
+
+def imap_idle_wait(mail: imaplib.IMAP4, timeout: float) -> bool:
+    """Blocking RFC 2177 IDLE: wait up to timeout for EXISTS, then send DONE"""
+    # Read straight from the socket: lines buffered inside imaplib's file
+    # object would be invisible to select() and stall the wait
+    sock = mail.sock
+    buffer = b''
+    
+    def read_line(deadline: Optional[float] = None) -> Optional[bytes]:
+        nonlocal buffer
+        while b'\r\n' not in buffer:
+            # SSL may already hold decrypted bytes that select() cannot see
+            pending = getattr(sock, 'pending', None)
+            if deadline is not None and not (pending and pending()):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+                    return None
+            chunk = sock.recv(8192)
+            if not chunk:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            buffer += chunk
+        line, _, buffer = buffer.partition(b'\r\n')
+        return line
+    
+    def is_new_mail(line: bytes) -> bool:
+        return line.startswith(b'*') and line.upper().endswith((b'EXISTS', b'RECENT'))
+    
+    tag = mail._new_tag()
+    mail.send(tag + b' IDLE\r\n')
+    line = read_line()
+    if not line.startswith(b'+'):
+        raise imaplib.IMAP4.error(f"IDLE rejected: {line.decode(errors='ignore')}")
+    
+    has_new_mail = False
+    deadline = time.monotonic() + timeout
+    while not has_new_mail:
+        line = read_line(deadline)
+        if line is None:
+            break
+        has_new_mail = is_new_mail(line)
+    
+    mail.send(b'DONE\r\n')
+    while True:
+        line = read_line()
+        if line.startswith(tag):
+            if not line[len(tag):].strip().upper().startswith(b'OK'):
+                raise imaplib.IMAP4.error(f"IDLE failed: {line.decode(errors='ignore')}")
+            break
+        # Notifications that arrived while DONE was in flight still count
+        has_new_mail = has_new_mail or is_new_mail(line)
+    return has_new_mail
+
+def imap_fingerprint(config: dict) -> tuple:
+    """Connection settings that invalidate a pooled session when changed"""
+    return (config['imap_server'], config['imap_port'], config['email'], config['password'])
+
+class IMAPSessionPool:
+    """Authenticated, INBOX-selected IMAP sessions kept alive across cycles, keyed by account id"""
+
+    def __init__(self):
+        self._sessions: dict[str, AsyncIMAPClient] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def _lock(self, account_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(account_id, asyncio.Lock())
+
+    async def _open(self, account: dict) -> AsyncIMAPClient:
+        with stage_timer("login"):
+            mail = await AsyncIMAPClient(account).connect()
+            try:
+                await mail.select('INBOX')
+            except Exception:
+                await mail.logout()
+                raise
+        self._sessions[account['id']] = mail
+        return mail
+
+    async def _checkout(self, account: dict) -> AsyncIMAPClient:
+        mail = self._sessions.get(account['id'])
+        if mail is not None and imap_fingerprint(mail.config) != imap_fingerprint(account):
+            await self._discard(account['id'])
+            mail = None
+        if mail is not None and time.monotonic() - mail.last_used > IMAP_KEEPALIVE_INTERVAL:
+            # Idle long enough that the server may have dropped us
+            try:
+                await mail.noop()
+            except Exception as e:
+                logger.info(f"[{account['name']}] Stale IMAP session, reconnecting: {e}")
+                await self._discard(account['id'])
+                mail = None
+        if mail is None:
+            mail = await self._open(account)
+        return mail
+
+    async def _discard(self, account_id: str):
+        mail = self._sessions.pop(account_id, None)
+        if mail is not None:
+            await mail.logout()
+
+    @asynccontextmanager
+    async def session(self, account: dict):
+        """Borrow the account's session exclusively; broken connections are dropped"""
+        async with self._lock(account['id']):
+            mail = await self._checkout(account)
+            try:
+                yield mail
+            except (imaplib.IMAP4.abort, OSError):
+                await self._discard(account['id'])
+                raise
+            except Exception:
+                raise
+            except BaseException:
+                # Cancelled mid-check: an IMAP thread may still be running a command on
+                # this connection, so close it instead of lending it to the next check
+                if self._sessions.get(account['id']) is mail:
+                    del self._sessions[account['id']]
+                mail.abort()
+                raise
+
+    async def evict(self, account_id: str):
+        """Close the pooled session for an edited or deleted account
+        
+        The lock stays: a check woken on it may already be running, and a fresh lock
+        would let the next check use the account's session alongside it.
+        """
+        async with self._lock(account_id):
+            await self._discard(account_id)
+
+    async def keepalive(self, keep: Optional[set] = None):
+        """Send NOOP on idle sessions so servers do not time them out
+        
+        Sessions of accounts outside keep (e.g. leased to another worker) are closed instead.
+        """
+        for account_id, mail in list(self._sessions.items()):
+            lock = self._lock(account_id)
+            if lock.locked():
+                continue
+            if keep is not None and account_id not in keep:
+                await self.evict(account_id)
+                continue
+            if time.monotonic() - mail.last_used < IMAP_KEEPALIVE_INTERVAL:
+                continue
+            async with lock:
+                if self._sessions.get(account_id) is not mail:
+                    continue
+                try:
+                    await mail.noop()
+                except Exception as e:
+                    logger.info(f"Dropping stale IMAP session for {mail.config.get('name', account_id)}: {e}")
+                    await self._discard(account_id)
+
+    async def close_all(self):
+        for account_id in list(self._sessions):
+            await self._discard(account_id)
+
+imap_pool = IMAPSessionPool()
+
+async def imap_keepalive_loop():
+    """Background NOOP keepalive for pooled IMAP sessions"""
+    while True:
+        await asyncio.sleep(IMAP_KEEPALIVE_INTERVAL / 2)
+        try:
+            await imap_pool.keepalive(keep=set(account_leases.held))
+        except Exception as e:
+            logger.error(f"IMAP keepalive error: {e}")
+
 def decode_email_subject(subject):
     """Decode email subject"""
     if subject is None:
@@ -197,246 +804,1703 @@ def decode_email_subject(subject):
             subject_str += part
     return subject_str
 
-def extract_verification_link(html_content: str) -> Optional[str]:
-    """Extract Netflix verification link from email HTML"""
-    patterns = [
-        r'href=["\']?(https://www\.netflix\.com/account/update-primary-location\?[^"\'>\s]+)["\']?',
-        r'href=["\']?(https://www\.netflix\.com/account/household[^"\'>\s]*)["\']?',
-        r'href=["\']?(https://www\.netflix\.com/[^"\'>\s]*update[^"\'>\s]*location[^"\'>\s]*)["\']?',
-        r'href=["\']?(https://www\.netflix\.com/account/travel/[^"\'>\s]*)["\']?',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, html_content, re.IGNORECASE)
-        if match:
-            return match.group(1)
-    
-    return None
-
-def extract_access_code(html_content: str) -> Optional[str]:
-    """Extract temporary access code from email"""
-    # Look for 6-digit codes
-    pattern = r'\b(\d{6})\b'
-    matches = re.findall(pattern, html_content)
-    if matches:
-        return matches[0]
-    return None
-
-def extract_recipient_name(html_content: str) -> str:
-    """Extract the recipient name from 'Hi CK,' pattern"""
-    pattern = r'Hi\s+([^,\n<]+)'
-    match = re.search(pattern, html_content)
-    if match:
-        return match.group(1).strip()
-    return "Unknown"
-
-def extract_device_info(html_content: str) -> Optional[str]:
-    """Extract device info from temporary access email"""
-    pattern = r'device[^:]*:?\s*([^\n<]+)'
-    match = re.search(pattern, html_content, re.IGNORECASE)
-    if match:
-        return match.group(1).strip()
-    return None
-
-def detect_email_type(subject: str, body: str) -> str:
-    """Detect Netflix email type"""
-    subject_lower = subject.lower()
-    body_lower = body.lower()
-    
-    # Temporary access code detection
-    if any(kw in subject_lower for kw in ['temporary access', 'access code', 'temporary code']):
-        return "temporary_access"
-    if any(kw in body_lower for kw in ['temporary access code', 'get a temporary access code']):
-        return "temporary_access"
-    
-    # Household update detection
-    household_keywords = [
-        'household', 'update your netflix', 'update netflix', 
-        'primary location', 'this was me', 'yes, this was me',
-        'update the netflix household', 'netflix household'
-    ]
-    if any(kw in subject_lower for kw in household_keywords):
-        return "household_update"
-    if any(kw in body_lower for kw in household_keywords):
-        return "household_update"
-    
-    return "other"
-
-def get_email_body(msg):
-    """Extract email body from message"""
-    body = ""
-    if msg.is_multipart():
-        for part in msg.walk():
-            content_type = part.get_content_type()
-            if content_type == "text/html":
-                payload = part.get_payload(decode=True)
-                if payload:
-                    body = payload.decode('utf-8', errors='ignore')
-                    break
-            elif content_type == "text/plain" and not body:
-                payload = part.get_payload(decode=True)
-                if payload:
-                    body = payload.decode('utf-8', errors='ignore')
-    else:
-        payload = msg.get_payload(decode=True)
-        if payload:
-            body = payload.decode('utf-8', errors='ignore')
-    return body
+TEMPORARY_ACCESS_SUBJECT_KEYWORDS = ['temporary access', 'access code', 'temporary code']
+TEMPORARY_ACCESS_BODY_KEYWORDS = ['temporary access code', 'get a temporary access code']
+HOUSEHOLD_KEYWORDS = [
+    'household', 'update your netflix', 'update netflix', 
+    'primary location', 'this was me', 'yes, this was me',
+    'update the netflix household', 'netflix household'
+]
+
+# Verification link patterns, highest priority first
+VERIFICATION_LINK_PATTERNS = [
+    r'https://www\.netflix\.com/account/update-primary-location\?[^"\'>\s]+',
+    r'https://www\.netflix\.com/account/household[^"\'>\s]*',
+    r'https://www\.netflix\.com/[^"\'>\s]*update[^"\'>\s]*location[^"\'>\s]*',
+    r'https://www\.netflix\.com/account/travel/[^"\'>\s]*',
+]
+
+class ClassifiedEmail(BaseModel):
+    email_type: str  # "household_update", "temporary_access" or "other"
+    recipient: str = "Unknown"
+    verification_link: Optional[str] = None
+    access_code: Optional[str] = None
+    device_info: Optional[str] = None
 
-async def click_verification_link(link: str) -> tuple[bool, str]:
-    """Click the Netflix verification link"""
+def minimal_keywords(keywords: List[str]) -> tuple:
+    """Drop keywords that contain a shorter keyword; they can never change the outcome"""
+    lowered = sorted({kw.lower() for kw in keywords}, key=len)
+    kept = []
+    for kw in lowered:
+        if not any(shorter in kw for shorter in kept):
+            kept.append(kw)
+    return tuple(kept)
+
+class NetflixEmailClassifier:
+    """Classifies a Netflix email and extracts its fields in one call
+
+    Patterns are compiled once. The body is lowercased once and shared by the
+    keyword scan and link search, and extraction only runs for relevant mail.
+    """
+
+    LINK_PREFIX = 'https://www.netflix.com/'
+
+    def __init__(self):
+        self.access_subject_keywords = minimal_keywords(TEMPORARY_ACCESS_SUBJECT_KEYWORDS)
+        self.access_body_keywords = minimal_keywords(TEMPORARY_ACCESS_BODY_KEYWORDS)
+        self.household_keywords = minimal_keywords(HOUSEHOLD_KEYWORDS)
+        self.link_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in VERIFICATION_LINK_PATTERNS]
+        self.link_pattern = re.compile(
+            r'href=["\']?(' + '|'.join(f'(?:{pattern})' for pattern in VERIFICATION_LINK_PATTERNS) + ')',
+            re.IGNORECASE
+        )
+        self.access_code_pattern = re.compile(r'\b(\d{6})\b')
+        self.recipient_pattern = re.compile(r'Hi\s+([^,\n<]+)')
+        self.device_pattern = re.compile(r'device[^:]*:?\s*([^\n<]+)', re.IGNORECASE)
+
+    def detect_type(self, subject_lower: str, body_lower: str) -> str:
+        # Temporary access takes precedence over household, subject before body
+        if any(kw in subject_lower for kw in self.access_subject_keywords):
+            return "temporary_access"
+        if any(kw in body_lower for kw in self.access_body_keywords):
+            return "temporary_access"
+        if any(kw in subject_lower for kw in self.household_keywords):
+            return "household_update"
+        if any(kw in body_lower for kw in self.household_keywords):
+            return "household_update"
+        return "other"
+
+    def find_link(self, body: str, body_lower: str) -> Optional[str]:
+        if len(body_lower) != len(body):
+            # Lowercasing changed offsets (rare Unicode), so scan the original text
+            matches = [match.group(1) for match in self.link_pattern.finditer(body)]
+            return self._best_link(matches)
+        
+        # Jump between Netflix URL occurrences instead of running one regex per pattern
+        candidates = []
+        pos = body_lower.find(self.LINK_PREFIX)
+        while pos != -1:
+            if body_lower.endswith(('href=', 'href="', "href='"), max(0, pos - 6), pos):
+                for priority, pattern in enumerate(self.link_patterns):
+                    match = pattern.match(body, pos)
+                    if match:
+                        if priority == 0:
+                            return match.group()
+                        candidates.append((priority, match.group()))
+                        break
+            pos = body_lower.find(self.LINK_PREFIX, pos + 1)
+        return min(candidates, key=lambda candidate: candidate[0])[1] if candidates else None
+
+    def _best_link(self, urls: List[str]) -> Optional[str]:
+        for pattern in self.link_patterns:
+            for url in urls:
+                if pattern.fullmatch(url):
+                    return url
+        return None
+
+    def classify(self, subject: str, body: str) -> ClassifiedEmail:
+        body_lower = body.lower()
+        email_type = self.detect_type(subject.lower(), body_lower)
+        if email_type == "other":
+            return ClassifiedEmail(email_type=email_type)
+        
+        recipient = self.recipient_pattern.search(body)
+        result = ClassifiedEmail(
+            email_type=email_type,
+            recipient=recipient.group(1).strip() if recipient else "Unknown",
+            verification_link=self.find_link(body, body_lower)
+        )
+        if email_type == "temporary_access":
+            code = self.access_code_pattern.search(body)
+            device = self.device_pattern.search(body)
+            result.access_code = code.group(1) if code else None
+            result.device_info = device.group(1).strip() if device else None
+        return result
+
+email_classifier = NetflixEmailClassifier()
+
+# ============ Search Planner ============
+
+NETFLIX_SENDERS = ['netflix.com', 'netflix', 'account.netflix.com']
+SEARCH_WINDOW_DAYS = int(os.environ.get('SEARCH_WINDOW_DAYS', '2'))  # Netflix links expire long before this
+IMAP_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def imap_quote(value: str) -> str:
+    """Quote a string argument for an IMAP command"""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def imap_date(value: datetime) -> str:
+    """Format a date for SINCE/BEFORE (locale independent)"""
+    return f"{value.day:02d}-{IMAP_MONTHS[value.month - 1]}-{value.year}"
+
+def is_gmail(account: dict, capabilities: set) -> bool:
+    """Gmail servers understand the X-GM-RAW search extension"""
+    return 'X-GM-EXT-1' in capabilities or account.get('imap_server', '').lower() == 'imap.gmail.com'
+
+def plan_netflix_search(gmail: bool, window_days: int = SEARCH_WINDOW_DAYS) -> List[str]:
+    """Build one SEARCH criteria list matching recent Netflix mail"""
+    if gmail:
+        # Gmail full-text terms cover both subject and body, like the classifier
+        keywords = dict.fromkeys(TEMPORARY_ACCESS_SUBJECT_KEYWORDS + TEMPORARY_ACCESS_BODY_KEYWORDS + HOUSEHOLD_KEYWORDS)
+        terms = ' OR '.join(f'"{kw}"' for kw in keywords)
+        return ['X-GM-RAW', imap_quote(f'from:netflix newer_than:{window_days}d ({terms})')]
+    
+    since = imap_date(datetime.now(timezone.utc) - timedelta(days=window_days))
+    criteria = f'FROM {imap_quote(NETFLIX_SENDERS[-1])}'
+    for sender in reversed(NETFLIX_SENDERS[:-1]):
+        criteria = f'OR FROM {imap_quote(sender)} {criteria}'
+    return ['SINCE', since, f'({criteria})']
+
+# ============ MIME Body Extraction ============
+
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', str(256 * 1024)))  # Decoded bytes kept per email body
+
+def encoded_length_cap(max_bytes: int, transfer_encoding: str) -> int:
+    """Encoded bytes needed to decode at most max_bytes"""
+    if transfer_encoding == 'base64':
+        return (max_bytes // 3 + 1) * 4 * 78 // 76 + 4  # 4/3 expansion plus CRLF every 76 chars
+    if transfer_encoding == 'quoted-printable':
+        return max_bytes * 3
+    return max_bytes
+
+BASE64_NOISE_RE = re.compile(rb'[^A-Za-z0-9+/]')
+
+def decode_transfer_payload(payload: bytes, transfer_encoding: str, charset: str, max_bytes: int = MAX_BODY_BYTES) -> str:
+    """Decode a (possibly truncated) part payload and cap it at max_bytes"""
+    if transfer_encoding == 'base64':
+        # Lenient like mail clients: skip stray characters and padding, decode a cut-off last group
+        payload = BASE64_NOISE_RE.sub(b'', payload)
+        if len(payload) % 4 == 1:
+            payload = payload[:-1]
+        payload = base64.b64decode(payload + b'=' * (-len(payload) % 4))
+    elif transfer_encoding == 'quoted-printable':
+        payload = quopri.decodestring(payload)
+    payload = payload[:max_bytes]
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=30.0) as http_client:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            response = await http_client.get(link, headers=headers)
-            if response.status_code in [200, 302, 301]:
-                return True, f"Success: Status {response.status_code}"
+        return payload.decode(charset or 'utf-8', errors='ignore')
+    except LookupError:
+        return payload.decode('utf-8', errors='ignore')
+
+def split_part_headers(raw: bytes, start: int, end: int) -> tuple:
+    """Parse the header block of the MIME part raw[start:end]; returns (headers, body_start)"""
+    if raw.startswith((b'\r\n', b'\n'), start):
+        return BytesHeaderParser().parsebytes(b''), raw.index(b'\n', start) + 1
+    candidates = [pos for pos in (raw.find(b'\n\r\n', start, end), raw.find(b'\n\n', start, end)) if pos != -1]
+    if not candidates:
+        return BytesHeaderParser().parsebytes(raw[start:end]), end
+    header_end = min(candidates)
+    body_start = raw.index(b'\n', header_end + 1) + 1
+    return BytesHeaderParser().parsebytes(raw[start:header_end + 1]), body_start
+
+def find_text_part(raw: bytes, start: int, end: int, boundary: bytes) -> tuple:
+    """Walk a multipart body by boundary without decoding anything
+
+    Returns ((headers, body_start, body_end) for the first text/html part, else the
+    first text/plain part, or None) as soon as an HTML part is found.
+    """
+    delimiter = b'--' + boundary
+    plain = None
+    pos = raw.find(delimiter, start, end)
+    while pos != -1:
+        after = pos + len(delimiter)
+        if raw.startswith(b'--', after):
+            break  # Closing delimiter
+        line_end = raw.find(b'\n', after, end)
+        if line_end == -1:
+            break
+        next_delimiter = raw.find(b'\n' + delimiter, line_end + 1, end)
+        part_end = end if next_delimiter == -1 else next_delimiter
+        headers, body_start = split_part_headers(raw, line_end + 1, part_end)
+        body_end = part_end - 1 if raw[part_end - 1:part_end] == b'\r' else part_end
+        
+        content_type = headers.get_content_type()
+        if content_type.startswith('multipart/') and headers.get_param('boundary'):
+            html, nested_plain = find_text_part(raw, body_start, body_end, headers.get_param('boundary').encode())
+            if html:
+                return html, None
+            plain = plain or nested_plain
+        elif content_type == 'text/html':
+            return (headers, body_start, body_end), None
+        elif content_type == 'text/plain' and plain is None:
+            plain = (headers, body_start, body_end)
+        # Anything else (images, attachments) is skipped without being decoded
+        pos = -1 if next_delimiter == -1 else next_delimiter + 1
+    return None, plain
+
+def extract_email_body(raw: bytes, max_bytes: int = MAX_BODY_BYTES) -> str:
+    """Return the text/html body (else text/plain) of a raw RFC 822 message
+
+    Only part headers are parsed; the chosen part is the only payload decoded,
+    and no more than max_bytes of it.
+    """
+    headers, body_start = split_part_headers(raw, 0, len(raw))
+    part = (headers, body_start, len(raw))
+    if headers.get_content_maintype() == 'multipart':
+        boundary = headers.get_param('boundary')
+        if not boundary:
+            return ""
+        html, plain = find_text_part(raw, body_start, len(raw), boundary.encode())
+        part = html or plain
+        if part is None:
+            return ""
+    
+    part_headers, start, end = part
+    transfer_encoding = (part_headers.get('Content-Transfer-Encoding') or '7bit').strip().lower()
+    end = min(end, start + encoded_length_cap(max_bytes, transfer_encoding))
+    return decode_transfer_payload(raw[start:end], transfer_encoding, part_headers.get_content_charset(), max_bytes)
+
+# ============ IMAP Fetch Parsing ============
+
+HEADER_FIELDS = 'BODY.PEEK[HEADER.FIELDS (SUBJECT FROM MESSAGE-ID DATE)]'
+IMAP_ATOM_RE = re.compile(rb'[^\s()\[\]"{]+(?:\[[^\]]*\][^\s()"{]*)?')
+FETCH_START_RE = re.compile(rb'\d+ \(')
+
+def uid_set(uids: List[int]) -> str:
+    """Compact UID set, e.g. [1, 2, 3, 7] -> '1:3,7'"""
+    ranges = []
+    for _, run in itertools.groupby(enumerate(sorted(uids)), lambda pair: pair[1] - pair[0]):
+        run = [uid for _, uid in run]
+        ranges.append(str(run[0]) if len(run) == 1 else f"{run[0]}:{run[-1]}")
+    return ','.join(ranges)
+
+def parse_imap_list(text: bytes, pos: int, literals) -> tuple[list, int]:
+    """Parse a parenthesized IMAP list starting at text[pos]; literals are consumed in order"""
+    items = []
+    pos += 1
+    while pos < len(text):
+        char = text[pos:pos + 1]
+        if char == b' ':
+            pos += 1
+        elif char == b')':
+            return items, pos + 1
+        elif char == b'(':
+            sub_items, pos = parse_imap_list(text, pos, literals)
+            items.append(sub_items)
+        elif char == b'"':
+            value = bytearray()
+            pos += 1
+            while text[pos:pos + 1] != b'"':
+                if text[pos:pos + 1] == b'\\':
+                    pos += 1
+                value += text[pos:pos + 1]
+                pos += 1
+            items.append(bytes(value))
+            pos += 1
+        elif char == b'{':
+            items.append(next(literals))
+            pos = text.index(b'}', pos) + 1
+        else:
+            match = IMAP_ATOM_RE.match(text, pos)
+            if not match:
+                raise ValueError(f"Unexpected IMAP token at {pos}")
+            atom = match.group()
+            items.append(None if atom.upper() == b'NIL' else atom)
+            pos = match.end()
+    raise ValueError("Unterminated IMAP list")
+
+def parse_fetch_response(data: list) -> List[dict]:
+    """Turn imaplib FETCH data into one {attribute: value} dict per message"""
+    messages = []
+    
+    def parse_message(text: bytes, literals: list):
+        items, _ = parse_imap_list(text, text.index(b'('), iter(literals))
+        messages.append({
+            name.decode().upper(): value
+            for name, value in zip(items[::2], items[1::2])
+        })
+    
+    text, literals = b'', []
+    for part in data:
+        if part is None:
+            continue
+        prefix, literal = part if isinstance(part, tuple) else (part, None)
+        if text and FETCH_START_RE.match(prefix):
+            parse_message(text, literals)
+            text, literals = b'', []
+        text += prefix
+        if literal is not None:
+            literals.append(literal)
+    if text:
+        parse_message(text, literals)
+    return messages
+
+def find_body_section(structure: list) -> Optional[tuple]:
+    """Locate the text/html part (else the first text/plain) in a BODYSTRUCTURE
+
+    Returns (section, transfer_encoding, charset), mirroring extract_email_body's choice.
+    """
+    found = {}
+    
+    def walk(node: list, section: str):
+        if node and isinstance(node[0], list):
+            # Multipart: child parts come first, then the subtype and extension data
+            children = itertools.takewhile(lambda child: isinstance(child, list), node)
+            for index, child in enumerate(children, 1):
+                walk(child, f"{section}.{index}" if section else str(index))
+            return
+        content_type = f"{(node[0] or b'').decode().lower()}/{(node[1] or b'').decode().lower()}"
+        params = node[2] if isinstance(node[2], list) else []
+        charset = next(
+            (value.decode() for key, value in zip(params[::2], params[1::2]) if key.upper() == b'CHARSET'),
+            'utf-8'
+        )
+        part = (section or '1', (node[5] or b'7bit').decode().lower(), charset)
+        if not section:
+            found.setdefault('single', part)
+        elif content_type == 'text/html':
+            found.setdefault('html', part)
+        elif content_type == 'text/plain':
+            found.setdefault('plain', part)
+    
+    walk(structure, '')
+    return found.get('html') or found.get('plain') or found.get('single')
+
+def fallback_message_id(subject: str, sender: Optional[str], date: Optional[str]) -> str:
+    """Stable stand-in key for the rare message without a Message-ID header"""
+    digest = hashlib.sha1(f"{subject}|{sender}|{date}".encode()).hexdigest()
+    return f"<no-message-id-{digest}>"
+
+def parse_internaldate(value) -> Optional[datetime]:
+    """Parse an INTERNALDATE such as b'17-Jul-1996 02:44:25 -0700'"""
+    if not isinstance(value, bytes):
+        return None
+    try:
+        return datetime.strptime(value.decode().strip(), "%d-%b-%Y %H:%M:%S %z")
+    except ValueError:
+        return None
+
+async def fetch_candidate_headers(mail: AsyncIMAPClient, uids: List[int]) -> List[dict]:
+    """Phase 1: headers and body structure for all candidates, batched"""
+    candidates = []
+    for start in range(0, len(uids), FETCH_BATCH_SIZE):
+        batch = uids[start:start + FETCH_BATCH_SIZE]
+        requested = set(batch)
+        _, data = await mail.uid('FETCH', uid_set(batch), f'(UID INTERNALDATE BODYSTRUCTURE {HEADER_FIELDS})')
+        for item in parse_fetch_response(data):
+            # Unsolicited FETCH responses (e.g. FLAGS changed by another client) carry no UID
+            uid = int(item.get('UID', 0))
+            if uid not in requested:
+                continue
+            header_bytes = next((value for key, value in item.items() if key.startswith('BODY[HEADER')), b'')
+            headers = BytesHeaderParser().parsebytes(header_bytes or b'')
+            structure = item.get('BODYSTRUCTURE')
+            subject = decode_email_subject(headers['Subject'])
+            candidates.append({
+                "uid": uid,
+                "subject": subject,
+                "sender": headers['From'],
+                "message_id": headers.get('Message-ID', '').strip() or fallback_message_id(subject, headers['From'], headers['Date']),
+                "section": find_body_section(structure) if isinstance(structure, list) else None,
+                "arrived_at": parse_internaldate(item.get('INTERNALDATE')),
+            })
+    return sorted(candidates, key=lambda candidate: candidate['uid'])
+
+async def fetch_candidate_bodies(mail: AsyncIMAPClient, candidates: List[dict]) -> dict:
+    """Phase 2: only the text body section of each candidate, batched per section path and encoding
+    
+    Returns {uid: (payload, transfer_encoding, charset)} still encoded, for the parse stage;
+    transfer_encoding is None where the payload is the whole message.
+    """
+    bodies = {}
+    by_section = {}
+    for candidate in candidates:
+        if candidate['section']:
+            by_section.setdefault(candidate['section'][:2], []).append(candidate)
+    
+    for (section, transfer_encoding), group in by_section.items():
+        # Partial fetch caps the bytes the server sends at what MAX_BODY_BYTES decodes from
+        byte_cap = encoded_length_cap(MAX_BODY_BYTES, transfer_encoding)
+        for start in range(0, len(group), FETCH_BATCH_SIZE):
+            batch = {candidate['uid']: candidate for candidate in group[start:start + FETCH_BATCH_SIZE]}
+            _, data = await mail.uid('FETCH', uid_set(list(batch)), f'(UID BODY.PEEK[{section}]<0.{byte_cap}>)')
+            for item in parse_fetch_response(data):
+                candidate = batch.get(int(item.get('UID', 0)))
+                payload = item.get(f'BODY[{section}]<0>', item.get(f'BODY[{section}]'))
+                if candidate and payload is not None:
+                    _, transfer_encoding, charset = candidate['section']
+                    bodies[candidate['uid']] = (payload, transfer_encoding, charset)
+    
+    # Anything whose structure could not be used falls back to a full fetch
+    for candidate in candidates:
+        if candidate['uid'] not in bodies:
+            _, data = await mail.uid('FETCH', str(candidate['uid']), '(BODY.PEEK[])')
+            for response_part in data:
+                if isinstance(response_part, tuple):
+                    bodies[candidate['uid']] = (response_part[1], None, None)
+    return bodies
+
+# ============ Parse Stage ============
+
+RELEVANT_EMAIL_TYPES = ("household_update", "temporary_access")
+BODY_PREVIEW_CHARS = 2000  # Body characters stored on the email log
+PARSE_BATCH_SIZE = 8  # Emails per task sent to the parse pool, so one large check spreads across workers
+PARSE_OFFLOAD_MIN = 4  # Fewer emails are parsed inline; the round trip to a worker would cost more
+
+def parse_email_batch(items: List[tuple]) -> List[Optional[dict]]:
+    """Decode and classify fetched emails; runs in a parse worker process or inline
+    
+    Each item is (subject, payload, transfer_encoding, charset) as returned by
+    fetch_candidate_bodies, with payload None when nothing was fetched. Returns one
+    compact record per item: None for mail that is neither a household nor a
+    temporary access email, {"error": ...} when it could not be parsed.
+    """
+    records = []
+    for subject, payload, transfer_encoding, charset in items:
+        try:
+            if payload is None:
+                body = ''
+            elif transfer_encoding is None:
+                body = extract_email_body(payload)
             else:
-                return False, f"Failed: Status {response.status_code}"
-    except Exception as e:
-        return False, f"Error: {str(e)}"
+                body = decode_transfer_payload(payload, transfer_encoding, charset)
+            classified = email_classifier.classify(subject, body)
+        except Exception as e:
+            records.append({"error": str(e)})
+            continue
+        if classified.email_type in RELEVANT_EMAIL_TYPES:
+            records.append({**classified.model_dump(), "body_preview": body[:BODY_PREVIEW_CHARS]})
+        else:
+            records.append(None)
+    return records
+
+def init_parse_worker():
+    """Ignore Ctrl+C in parse workers; the server shuts the pool down itself on exit"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
 
-async def check_netflix_emails_for_account(account: dict, auto_click: bool = True):
-    """Check Netflix emails for a single account"""
-    global stats
+class ParseStage:
+    """parse_email_batch on a pool of PARSE_WORKERS processes, so bursts of mail do not starve the API"""
     
-    try:
-        mail = connect_imap(account)
-        mail.select('INBOX')
-        
-        # Search for Netflix emails (both read and unread)
-        # Try multiple search patterns
-        search_patterns = [
-            '(FROM "netflix.com")',
-            '(FROM "netflix")',
-            '(FROM "account.netflix.com")',
-        ]
-        
-        all_email_ids = set()
-        for pattern in search_patterns:
+    def __init__(self, workers: int = PARSE_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    async def start(self):
+        """Spawn the workers ahead of the first check; called from lifespan"""
+        if not self.workers or self._executor is not None:
+            return
+        # spawn, not fork: the parent has event loop, driver and pool threads that must not be copied
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'), initializer=init_parse_worker
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, parse_email_batch, []) for _ in range(self.workers)))
+        logger.info(f"Parse pool started with {self.workers} workers")
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def parse(self, items: List[tuple]) -> List[Optional[dict]]:
+        if self._executor is None or len(items) < PARSE_OFFLOAD_MIN:
+            return parse_email_batch(items)
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        chunks = [items[start:start + PARSE_BATCH_SIZE] for start in range(0, len(items), PARSE_BATCH_SIZE)]
+        try:
+            results = await asyncio.gather(*(loop.run_in_executor(executor, parse_email_batch, chunk) for chunk in chunks))
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed for memory); replace the pool once and keep this check going
+            if self._executor is executor:
+                logger.error(f"Parse pool broke, restarting it: {e}")
+                self.close()
+                await self.start()
+            return parse_email_batch(items)
+        return [record for chunk in results for record in chunk]
+
+parse_stage = ParseStage()
+
+# ============ Click Dispatcher ============
+
+CLICK_CONCURRENCY = int(os.environ.get('CLICK_CONCURRENCY', '10'))  # Verification links fetched at once
+CLICK_MAX_RETRIES = int(os.environ.get('CLICK_MAX_RETRIES', '3'))  # Retries after the first attempt
+CLICK_TIMEOUT = float(os.environ.get('CLICK_TIMEOUT', '30'))
+CLICK_BACKOFF_BASE = 0.5  # Seconds; attempt n sleeps uniformly in [0, base * 2**n]
+CLICK_BACKOFF_MAX = 8.0
+CLICK_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+class ClickDispatcher:
+    """Verification-link clicks over one pooled HTTP/2 client, bounded and retried"""
+    
+    def __init__(self, concurrency: int = CLICK_CONCURRENCY, max_retries: int = CLICK_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency, keepalive_expiry=120)
+    
+    def start(self):
+        """Create the shared client; called from lifespan"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True, follow_redirects=True, timeout=CLICK_TIMEOUT,
+                limits=self._limits, headers=CLICK_HEADERS
+            )
+    
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _backoff(self, attempt: int):
+        await asyncio.sleep(random.uniform(0, min(CLICK_BACKOFF_MAX, CLICK_BACKOFF_BASE * 2 ** attempt)))
+    
+    async def click(self, link: str) -> tuple[bool, str, float]:
+        """Fetch a verification link; returns (success, response, latency_ms) across all attempts"""
+        self.start()
+        start = time.perf_counter()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                retry = attempt < self.max_retries
+                try:
+                    response = await self._client.get(link)
+                except (httpx.TimeoutException, httpx.NetworkError) as e:
+                    if retry:
+                        await self._backoff(attempt)
+                        continue
+                    result = (False, f"Error: {type(e).__name__} after {attempt + 1} attempts")
+                    break
+                except Exception as e:
+                    result = (False, f"Error: {str(e)}")
+                    break
+                
+                if response.status_code >= 500 and retry:
+                    await self._backoff(attempt)
+                    continue
+                if response.status_code in [200, 302, 301]:
+                    result = (True, f"Success: Status {response.status_code}")
+                else:
+                    result = (False, f"Failed: Status {response.status_code}")
+                break
+        return (*result, round((time.perf_counter() - start) * 1000, 1))
+
+click_dispatcher = ClickDispatcher()
+
+CLICK_PRIORITY_NEW = 0  # Newly arrived household links expire within minutes
+CLICK_PRIORITY_BACKLOG = 1  # Links found while resyncing older mail
+
+class ClickJob:
+    """A household link waiting to be clicked on behalf of an email log"""
+    
+    def __init__(self, account: dict, doc: dict, arrived_at: Optional[datetime] = None):
+        self.account = account
+        self.doc = doc
+        self.arrived_at = arrived_at
+        self.detected_at = time.perf_counter()
+
+class ClickQueue:
+    """Priority queue of household links, clicked by dedicated workers ahead of persistence
+    
+    Workers click as soon as a job is queued, then wait for the email log to be
+    saved (resolve) before recording the outcome on it.
+    """
+    
+    def __init__(self, workers: int = CLICK_CONCURRENCY):
+        self.worker_count = workers
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()  # FIFO within a priority
+        self._saved: dict[str, asyncio.Future] = {}
+        self._workers: List[asyncio.Task] = []
+        self._recording: set[asyncio.Task] = set()
+    
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+    
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, *self._recording, return_exceptions=True)
+        self._workers = []
+    
+    def qsize(self) -> int:
+        return self._queue.qsize()
+    
+    def submit(self, account: dict, doc: dict, priority: int = CLICK_PRIORITY_NEW, arrived_at: Optional[datetime] = None):
+        self.start()
+        self._saved[doc['id']] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((priority, next(self._sequence), ClickJob(account, doc, arrived_at)))
+    
+    def resolve(self, docs: List[dict], new_docs: List[dict]):
+        """Tell waiting workers which of these email logs were stored"""
+        new_ids = {doc['id'] for doc in new_docs}
+        for doc in docs:
+            saved = self._saved.get(doc['id'])
+            if saved and not saved.done():
+                saved.set_result(doc['id'] in new_ids)
+    
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
             try:
-                _, messages = mail.search(None, pattern)
-                if messages[0]:
-                    all_email_ids.update(messages[0].split())
-            except:
-                pass
-        
-        email_ids = list(all_email_ids)
-        logger.info(f"[{account['name']}] Found {len(email_ids)} Netflix emails")
+                await self._click(job)
+            except Exception as e:
+                logger.error(f"[{job.account['name']}] Click worker error: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def _click(self, job: ClickJob):
+        success, response, latency_ms = await click_dispatcher.click(job.doc['verification_link'])
+        detected_to_clicked_ms = round((time.perf_counter() - job.detected_at) * 1000, 1)
+        stage_duration.labels("click").observe(latency_ms / 1000)
+        detected_to_click.observe(detected_to_clicked_ms / 1000)
+        clicks_total.labels("clicked" if success else "error").inc()
+        if success:
+            logger.info(f"[{job.account['name']}] Auto-clicked verification link in {detected_to_clicked_ms:.0f} ms")
+            if job.arrived_at:
+                arrival_to_click.observe((datetime.now(timezone.utc) - job.arrived_at).total_seconds())
         
-        # Process last 30 emails
-        for email_id in email_ids[-30:]:
+        # Recording runs on its own so the worker can take the next link right away
+        task = asyncio.create_task(self._record(job, success, response, latency_ms, detected_to_clicked_ms))
+        self._recording.add(task)
+        task.add_done_callback(self._recording.discard)
+    
+    async def _record(self, job: ClickJob, success: bool, response: str, latency_ms: float, detected_to_clicked_ms: float):
+        """Store a click's outcome on its email log once the log has been saved"""
+        try:
+            # The email log may still be on its way to the database
             try:
-                _, msg_data = mail.fetch(email_id, '(RFC822)')
-                
-                for response_part in msg_data:
-                    if isinstance(response_part, tuple):
-                        msg = email.message_from_bytes(response_part[1])
-                        subject = decode_email_subject(msg['Subject'])
-                        sender = msg['From']
-                        message_id = msg.get('Message-ID', '')
-                        
-                        body = get_email_body(msg)
-                        email_type = detect_email_type(subject, body)
-                        
-                        # Only process household and temporary access emails
-                        if email_type in ["household_update", "temporary_access"]:
-                            # Check if already processed using message_id or subject+sender combo
-                            existing = await db.email_logs.find_one({
-                                "$or": [
-                                    {"message_id": message_id} if message_id else {"_id": None},
-                                    {"account_id": account['id'], "subject": subject, "sender": sender}
-                                ]
-                            }, {"_id": 0})
-                            
-                            if not existing:
-                                recipient_name = extract_recipient_name(body)
-                                link = extract_verification_link(body)
-                                access_code = extract_access_code(body) if email_type == "temporary_access" else None
-                                device_info = extract_device_info(body) if email_type == "temporary_access" else None
-                                
-                                email_log = EmailLog(
-                                    account_id=account['id'],
-                                    account_name=account['name'],
-                                    email_type=email_type,
-                                    subject=subject,
-                                    sender=sender,
-                                    recipient=recipient_name,
-                                    received_at=datetime.now(timezone.utc),
-                                    verification_link=link,
-                                    access_code=access_code,
-                                    device_info=device_info,
-                                    status="detected",
-                                    raw_body=body[:2000]  # Store first 2000 chars
-                                )
-                                
-                                # Auto-click for household updates only
-                                if link and auto_click and email_type == "household_update":
-                                    success, response = await click_verification_link(link)
-                                    email_log.status = "clicked" if success else "error"
-                                    email_log.click_response = response
-                                    if success:
-                                        stats["links_clicked"] += 1
-                                        logger.info(f"[{account['name']}] Auto-clicked verification link!")
-                                    else:
-                                        stats["errors"] += 1
-                                
-                                # Save to database
-                                doc = email_log.model_dump()
-                                doc['received_at'] = doc['received_at'].isoformat()
-                                doc['processed_at'] = doc['processed_at'].isoformat()
-                                doc['message_id'] = message_id
-                                await db.email_logs.insert_one(doc)
-                                
-                                stats["emails_processed"] += 1
-                                await add_log("INFO", f"[{account['name']}] NEW: {subject[:50]}...")
-                                logger.info(f"[{account['name']}] Processed new email: {subject[:50]}...")
-            except Exception as e:
-                logger.error(f"Error processing email: {e}")
-                continue
+                saved = await self._saved[job.doc['id']]
+            finally:
+                del self._saved[job.doc['id']]
+            if not saved:
+                return
+            update = {
+                "status": "clicked" if success else "error",
+                "click_response": response,
+                "click_latency_ms": latency_ms,
+                "detected_to_clicked_ms": detected_to_clicked_ms
+            }
+            result = await db.email_logs.update_one({"id": job.doc['id'], "status": "detected"}, {"$set": update})
+            if result.modified_count:
+                event_broker.publish("email_update", {"id": job.doc['id'], **update})
+                counter = "links_clicked" if success else "errors"
+                await email_logs_changed({counter: 1, f"monitor.{counter}": 1})
+            if not success:
+                await add_log("ERROR", f"[{job.account['name']}] Verification link click failed: {response}")
+        except Exception as e:
+            logger.error(f"[{job.account['name']}] Error recording click: {e}")
+
+click_queue = ClickQueue()
+click_queue_depth.set_function(click_queue.qsize)
+
+async def process_netflix_email(account: dict, auto_click: bool, subject: str, sender: str, message_id: str, parsed: dict,
+                                click_priority: int = CLICK_PRIORITY_NEW, arrived_at: Optional[datetime] = None) -> dict:
+    """Build the log document for a relevant email's parse_email_batch record, queueing household links for clicking"""
+    email_type = parsed['email_type']
+    link = parsed['verification_link']
+    emails_processed_total.labels(email_type).inc()
+    
+    email_log = EmailLog(
+        account_id=account['id'],
+        account_name=account['name'],
+        email_type=email_type,
+        subject=subject,
+        sender=sender,
+        recipient=parsed['recipient'],
+        received_at=datetime.now(timezone.utc),
+        verification_link=link,
+        access_code=parsed['access_code'],
+        device_info=parsed['device_info'],
+        status="detected",
+        raw_body=parsed['body_preview']
+    )
+    
+    doc = email_log.model_dump()
+    doc['received_at'] = doc['received_at'].isoformat()
+    doc['processed_at'] = doc['processed_at'].isoformat()
+    doc['message_id'] = message_id
+    
+    # Auto-click for household updates only; the click does not wait for the log to be saved
+    if link and auto_click and email_type == "household_update":
+        click_queue.submit(account, doc, click_priority, arrived_at)
+    return doc
+
+async def save_email_logs(account: dict, docs: List[dict]) -> List[dict]:
+    """Bulk upsert one cycle's email logs; returns the documents that were new"""
+    if not docs:
+        return []
+    
+    requests = [
+        UpdateOne(
+            {"account_id": doc['account_id'], "message_id": doc['message_id']},
+            {"$setOnInsert": doc},
+            upsert=True
+        )
+        for doc in docs
+    ]
+    try:
+        result = await db.email_logs.bulk_write(requests, ordered=False)
+        upserted = result.upserted_ids
+    except BulkWriteError as e:
+        # Duplicate keys only mean an overlapping check stored the same email first
+        if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+            raise
+        upserted = {item['index']: item['_id'] for item in e.details.get('upserted', [])}
+    
+    for doc in docs:
+        seen_message_ids.add((account['id'], doc['message_id']))
+    
+    new_docs = [docs[index] for index in sorted(upserted)]
+    if new_docs:
+        await email_logs_changed(email_log_increments(new_docs))
+    for doc in new_docs:
+        event_broker.publish("email", {key: value for key, value in doc.items() if key != 'raw_body'})
+        await add_log("INFO", f"[{account['name']}] NEW: {doc['subject'][:50]}...")
+        logger.info(f"[{account['name']}] Processed new email: {doc['subject'][:50]}...")
+    return new_docs
+
+# Per-account background saves; the next check of an account waits for the previous one
+pending_saves: dict[str, asyncio.Task] = {}
+pending_saves_depth.set_function(lambda: len(pending_saves))
+
+async def persist_account_cycle(account: dict, docs: List[dict], uidvalidity: int, high_water: int,
+                                failed_attempts: Optional[dict] = None):
+    """Store one check's email logs, then advance the account's high-water mark
+    
+    failed_attempts counts the failed checks of each email above the mark, keyed by UID.
+    """
+    try:
+        with stage_timer("save"):
+            new_docs = await save_email_logs(account, docs)
+            click_queue.resolve(docs, new_docs)
+            await db.imap_sync_state.update_one(
+                {"account_id": account['id']},
+                {"$set": {
+                    "uidvalidity": uidvalidity,
+                    "last_uid": high_water,
+                    "failed_attempts": failed_attempts or {},
+                    "updated_at": datetime.now(timezone.utc).isoformat()
+                }},
+                upsert=True
+            )
+    except Exception as e:
+        click_queue.resolve(docs, [])
+        logger.error(f"Error saving emails for {account['name']}: {e}")
+        await increment_stats({"monitor.errors": 1})
+        await add_log("ERROR", f"[{account['name']}] Saving results failed: {str(e)}")
+    finally:
+        if pending_saves.get(account['id']) is asyncio.current_task():
+            del pending_saves[account['id']]
+
+# Accounts being checked right now; their leases are not handed over mid-check
+active_checks: set[str] = set()
+
+async def flush_pending_saves():
+    """Wait for every background email log save to finish"""
+    await asyncio.gather(*pending_saves.values(), return_exceptions=True)
+
+async def check_netflix_emails_for_account(account: dict, auto_click: bool = True) -> Optional[int]:
+    """Check Netflix emails for a single account
+    
+    Returns how many household or temporary access emails were found, or None if the check failed.
+    """
+    active_checks.add(account['id'])
+    started = time.perf_counter()
+    docs = []
+    try:
+        async with imap_pool.session(account) as mail:
+            # Read only once the session lock is held: a check that ran while this one
+            # waited for the lock leaves its save here, and the sync state is stale until it lands
+            previous_save = pending_saves.get(account['id'])
+            if previous_save:
+                await previous_save
+            with stage_timer("sync_state"):
+                state = await db.imap_sync_state.find_one({"account_id": account['id']}, {"_id": 0})
+            full_resync = not state or state.get('uidvalidity') != mail.uidvalidity
+            last_uid = 0 if full_resync else state['last_uid']
+            # MongoDB keys are strings, so the UIDs here are too
+            attempts = {} if full_resync else state.get('failed_attempts', {})
+            
+            # Cheap probe: highest UID in the mailbox, or every UID above the mark
+            with stage_timer("probe"):
+                if full_resync:
+                    logger.info(f"[{account['name']}] Full resync (UIDVALIDITY {mail.uidvalidity})")
+                    new_uids = await mail.uid_search('UID', '*')
+                else:
+                    new_uids = [uid for uid in await mail.uid_search('UID', f'{last_uid + 1}:*') if uid > last_uid]
+            if not full_resync and not new_uids:
+                return 0
+            high_water = max(new_uids, default=last_uid)
+            
+            # Search for Netflix emails (both read and unread) in one round trip
+            range_criteria = [] if full_resync else ['UID', f'{last_uid + 1}:*']
+            with stage_timer("search"):
+                gmail = is_gmail(account, await mail.capabilities())
+                try:
+                    all_email_uids = await mail.uid_search(*range_criteria, *plan_netflix_search(gmail))
+                except imaplib.IMAP4.abort:
+                    raise
+                except imaplib.IMAP4.error as e:
+                    if not gmail:
+                        raise
+                    logger.warning(f"[{account['name']}] X-GM-RAW search failed, using generic IMAP search: {e}")
+                    all_email_uids = await mail.uid_search(*range_criteria, *plan_netflix_search(False))
         
-        mail.logout()
+            email_uids = sorted(uid for uid in all_email_uids if uid > last_uid)
+            logger.info(f"[{account['name']}] Found {len(email_uids)} new Netflix emails")
+            if full_resync:
+                # Only the most recent ones matter on a first sync
+                email_uids = email_uids[-MAX_RESYNC_EMAILS:]
+            # Emails that failed too many checks are skipped; the mark moves past them
+            email_uids = [uid for uid in email_uids if attempts.get(str(uid), 0) < MAX_EMAIL_ATTEMPTS]
+            
+            # Phase 1: headers only; skip what is not from Netflix or already processed,
+            # consulting the in-memory LRU before the database
+            with stage_timer("fetch_headers"):
+                headers = await fetch_candidate_headers(mail, email_uids)
+            candidates = [
+                candidate for candidate in headers
+                if 'netflix' in (candidate['sender'] or '').lower()
+                and (account['id'], candidate['message_id']) not in seen_message_ids
+            ]
+            if candidates:
+                with stage_timer("dedup"):
+                    stored = await db.email_logs.distinct("message_id", {
+                        "account_id": account['id'],
+                        "message_id": {"$in": [candidate['message_id'] for candidate in candidates]}
+                    })
+                for message_id in stored:
+                    seen_message_ids.add((account['id'], message_id))
+                candidates = [candidate for candidate in candidates if candidate['message_id'] not in stored]
+            
+            # Phase 2: text body section of the remaining candidates
+            with stage_timer("fetch_bodies"):
+                payloads = await fetch_candidate_bodies(mail, candidates)
+            
+            failed_uids = []
+            with stage_timer("parse"):
+                records = await parse_stage.parse([
+                    (candidate['subject'], *payloads.get(candidate['uid'], (None, None, None)))
+                    for candidate in candidates
+                ])
+                for candidate, record in zip(candidates, records):
+                    if record is None:
+                        seen_message_ids.add((account['id'], candidate['message_id']))
+                        continue
+                    try:
+                        if 'error' in record:
+                            raise ValueError(record['error'])
+                        doc = await process_netflix_email(
+                            account, auto_click,
+                            subject=candidate['subject'],
+                            sender=candidate['sender'],
+                            message_id=candidate['message_id'],
+                            parsed=record,
+                            click_priority=CLICK_PRIORITY_BACKLOG if full_resync else CLICK_PRIORITY_NEW,
+                            arrived_at=candidate['arrived_at']
+                        )
+                    except Exception as e:
+                        logger.error(f"Error processing email: {e}")
+                        failed_uids.append(candidate['uid'])
+                        continue
+                    docs.append(doc)
+            
+            # Failed messages stay above the mark so the next cycles retry them,
+            # up to MAX_EMAIL_ATTEMPTS checks each
+            checked = {str(uid) for uid in email_uids}
+            failed_attempts = {uid: count for uid, count in attempts.items() if uid not in checked}
+            retrying = []
+            for uid in failed_uids:
+                count = failed_attempts[str(uid)] = attempts.get(str(uid), 0) + 1
+                if count < MAX_EMAIL_ATTEMPTS:
+                    retrying.append(uid)
+                    continue
+                logger.error(f"[{account['name']}] Skipping email UID {uid} after {count} failed checks")
+                await add_log("ERROR", f"[{account['name']}] Skipped an email that failed {count} checks")
+            if retrying:
+                high_water = min(high_water, min(retrying) - 1)
+            failed_attempts = {uid: count for uid, count in failed_attempts.items() if int(uid) > high_water}
+            
+            # Writes and activity logs finish in the background so a slow database
+            # does not hold this account's concurrency slot
+            pending_saves[account['id']] = asyncio.create_task(
+                persist_account_cycle(account, docs, mail.uidvalidity, high_water, failed_attempts)
+            )
+        return len(docs)
         
+    except asyncio.CancelledError:
+        click_queue.resolve(docs, [])
+        raise
     except Exception as e:
+        click_queue.resolve(docs, [])  # Queued clicks must not wait for logs that will never be saved
         logger.error(f"Error checking emails for {account.get('name', 'unknown')}: {e}")
-        stats["errors"] += 1
+        account_check_failures.labels(account['name']).inc()
+        await increment_stats({"monitor.errors": 1})
         await add_log("ERROR", f"[{account.get('name', 'unknown')}] Check failed: {str(e)}")
+        return None
+    finally:
+        active_checks.discard(account['id'])
+        elapsed = time.perf_counter() - started
+        stage_duration.labels("check").observe(elapsed)
+        account_last_check_duration.labels(account['name']).set(elapsed)
+
+async def stream_accounts(query: dict, projection: Optional[dict] = None):
+    """Yield matching accounts in id order, fetched ACCOUNT_BATCH_SIZE at a time"""
+    cursor = db.imap_accounts.find(query, projection or {"_id": 0}).sort("id", ASCENDING).batch_size(ACCOUNT_BATCH_SIZE)
+    async for account in cursor:
+        yield account
+
+async def load_monitoring_config() -> MonitoringConfig:
+    """Load monitoring configuration with defaults applied"""
+    return MonitoringConfig(**(await db.monitoring_config.find_one({}, {"_id": 0}) or {}))
+
+async def check_all_accounts(accounts: Optional[List[dict]] = None):
+    """Check Netflix emails for the active accounts leased by this worker, or only the given ones"""
+    config = await config_registry.config()
+    if accounts is None:
+        owned = account_leases.owned()
+        accounts = (account for account in await config_registry.accounts() if account['id'] in owned)
+    
+    # max_concurrent_checks workers pull accounts from a short queue, so a slow or
+    # failing mailbox only holds up its own worker and thousands of accounts do
+    # not become thousands of waiting tasks
+    queue: asyncio.Queue = asyncio.Queue(maxsize=config.max_concurrent_checks)
+    unhandled = 0
+    
+    async def worker():
+        nonlocal unhandled
+        while (account := await queue.get()) is not None:
+            try:
+                await check_netflix_emails_for_account(account, config.auto_click)
+            except Exception as e:
+                logger.error(f"Unhandled error checking {account.get('name', 'unknown')}: {e}")
+                unhandled += 1
+    
+    with cycle_duration.time():
+        workers = [asyncio.create_task(worker()) for _ in range(config.max_concurrent_checks)]
+        try:
+            for account in accounts:
+                await queue.put(account)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+    
+    await increment_stats({"monitor.errors": unhandled}, **{"monitor.last_check": datetime.now(timezone.utc).isoformat()})
 
-async def check_all_accounts():
-    """Check Netflix emails for all active accounts"""
-    global stats
+# Accounts whose server rejected IDLE; they are polled instead
+idle_unsupported: set[str] = set()
+
+async def idle_watch_account(account: dict):
+    """Hold an IMAP IDLE session for one account and check it whenever new mail arrives"""
+    backoff = 5
+    while is_monitoring:
+        try:
+            async with AsyncIMAPClient(account) as mail:
+                if 'IDLE' not in await mail.capabilities():
+                    idle_unsupported.add(account['id'])
+                    await add_log("WARNING", f"[{account['name']}] Server does not support IDLE, falling back to polling")
+                    return
+                await mail.select('INBOX')
+                logger.info(f"[{account['name']}] IDLE session established")
+                
+                # Catch up on anything that arrived before the session was up
+                config = await config_registry.config()
+                await check_netflix_emails_for_account(account, config.auto_click)
+                backoff = 5
+                
+                while is_monitoring:
+                    if await mail.idle():
+                        config = await config_registry.config()
+                        await check_netflix_emails_for_account(account, config.auto_click)
+                        await increment_stats({}, **{"monitor.last_check": datetime.now(timezone.utc).isoformat()})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[{account['name']}] IDLE session error: {e}")
+            await add_log("ERROR", f"[{account['name']}] IDLE session dropped: {str(e)}")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 300)
+
+def sync_idle_watchers(watchers: dict, accounts: List[dict]) -> List[dict]:
+    """Start, restart or stop IDLE watchers so they match the active accounts
+
+    At most IMAP_MAX_IDLE_SESSIONS watchers run, one per idle_executor thread; a
+    watcher beyond that would wait in the executor queue for minutes. Returns the
+    accounts left without a watcher, which are polled instead.
+    """
+    wanted = {acc['id']: acc for acc in accounts if acc['id'] not in idle_unsupported}
+    for account_id, (fingerprint, task) in list(watchers.items()):
+        account = wanted.get(account_id)
+        if account is None or imap_fingerprint(account) != fingerprint or task.done():
+            task.cancel()
+            del watchers[account_id]
+    overflow = []
+    for account_id, account in wanted.items():
+        if account_id in watchers:
+            continue
+        if len(watchers) >= IMAP_MAX_IDLE_SESSIONS:
+            overflow.append(account)
+            continue
+        watchers[account_id] = (imap_fingerprint(account), asyncio.create_task(idle_watch_account(account)))
+    return overflow
+
+# ============ Config Registry ============
+
+REGISTRY_MAX_AGE = 30  # Seconds cached entries are trusted when no change stream is open
+
+class ConfigRegistry:
+    """In-memory monitoring config and active accounts
+    
+    Every active account document stays resident, loaded in ACCOUNT_BATCH_SIZE
+    cursor batches and shared with callers as one tuple rather than copied.
+    
+    Entries are dropped by the API routes that change them and, on a replica set,
+    by a change stream on imap_accounts and monitoring_config, which also covers
+    changes made through other workers. Without a change stream they are reloaded
+    after REGISTRY_MAX_AGE seconds. Every change wakes the polling scheduler.
+    """
+    
+    def __init__(self, max_age: float = REGISTRY_MAX_AGE):
+        self.max_age = max_age
+        self._config: Optional[tuple] = None  # (loaded_at, MonitoringConfig)
+        self._accounts: Optional[tuple] = None  # (loaded_at, tuple of active account docs)
+        self._generation = 0  # Bumped on invalidation so a load racing with a change is not cached
+        self._watching = False
+        self._task: Optional[asyncio.Task] = None
+    
+    def _fresh(self, entry: Optional[tuple]) -> bool:
+        return entry is not None and (self._watching or time.monotonic() - entry[0] < self.max_age)
+    
+    async def config(self) -> MonitoringConfig:
+        if not self._fresh(self._config):
+            generation, loaded_at = self._generation, time.monotonic()
+            config = await load_monitoring_config()
+            if generation != self._generation:
+                return config
+            self._config = (loaded_at, config)
+        return self._config[1]
+    
+    async def accounts(self) -> tuple:
+        """Active accounts, as stored; the shared cached tuple, so callers must not modify the documents"""
+        if not self._fresh(self._accounts):
+            generation, loaded_at = self._generation, time.monotonic()
+            accounts = tuple([account async for account in stream_accounts({"is_active": True})])
+            if generation != self._generation:
+                return accounts
+            self._accounts = (loaded_at, accounts)
+        return self._accounts[1]
     
-    accounts = await db.imap_accounts.find({"is_active": True}, {"_id": 0}).to_list(100)
-    config = await db.monitoring_config.find_one({}, {"_id": 0})
-    auto_click = config.get('auto_click', True) if config else True
+    def invalidate_config(self):
+        self._generation += 1
+        self._config = None
+        polling_scheduler.wake.set()
     
-    for account in accounts:
-        await check_netflix_emails_for_account(account, auto_click)
+    def invalidate_accounts(self):
+        self._generation += 1
+        self._accounts = None
+        polling_scheduler.wake.set()
     
-    stats["last_check"] = datetime.now(timezone.utc).isoformat()
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _watch(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": ["imap_accounts", "monitoring_config"]}}}]
+        while True:
+            try:
+                async with db.watch(pipeline) as stream:
+                    self._watching = True
+                    # Anything changed before the stream opened
+                    self.invalidate_config()
+                    self.invalidate_accounts()
+                    logger.info("Watching accounts and monitoring config for changes")
+                    async for change in stream:
+                        if change['ns']['coll'] == "monitoring_config":
+                            self.invalidate_config()
+                        else:
+                            self.invalidate_accounts()
+            except OperationFailure as e:
+                # Standalone servers have no change streams; the max age covers other workers' edits
+                logger.info(f"Change streams unavailable, reloading config every {self.max_age}s: {e}")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Config change stream interrupted: {e}")
+            finally:
+                self._watching = False
+            await asyncio.sleep(self.max_age)
 
-async def monitoring_loop():
-    """Background monitoring loop"""
-    global is_monitoring, stats
+config_registry = ConfigRegistry()
+
+
+# ============ Polling Scheduler ============
+
+SCHEDULE_JITTER = 0.1  # Each interval is stretched or shrunk by up to 10% so logins spread out
+SCHEDULE_MIN_SLEEP = 0.5  # Seconds; keeps the loop from spinning when several accounts are due
+
+class PollingScheduler:
+    """Per-account next-due times with jitter, failure backoff and a temporary hot interval"""
     
-    while is_monitoring:
-        config = await db.monitoring_config.find_one({}, {"_id": 0})
-        polling_interval = config.get('polling_interval', 60) if config else 60
+    def __init__(self):
+        self._states: dict[str, dict] = {}
+        self.wake = asyncio.Event()  # Set to re-plan early, e.g. when a check finishes
+        self._wake_at = 0.0  # When the current sleep ends by itself
+    
+    def sync(self, accounts: List[dict], config: MonitoringConfig, now: float):
+        """Track exactly these accounts; new ones are spread across their first interval
         
-        accounts = await db.imap_accounts.find({"is_active": True}, {"_id": 0}).to_list(100)
-        if accounts:
-            await check_all_accounts()
+        An account whose interval changed since its last check is re-planned from that check.
+        """
+        ids = {account['id'] for account in accounts}
+        for account_id in list(self._states):
+            if account_id not in ids:
+                del self._states[account_id]
+        for account in accounts:
+            state = self._states.get(account['id'])
+            if state is None:
+                first_delay = random.uniform(0, self.base_interval(account, config))
+                self._states[account['id']] = {
+                    "next_due": now + first_delay, "failures": 0, "hot_until": 0.0,
+                    "planned_at": now, "interval": self.base_interval(account, config)
+                }
+                continue
+            interval = self.interval(account, config, now)
+            if interval != state['interval']:
+                state['interval'] = interval
+                state['next_due'] = state['planned_at'] + interval * random.uniform(1 - SCHEDULE_JITTER, 1 + SCHEDULE_JITTER)
+    
+    def base_interval(self, account: dict, config: MonitoringConfig) -> float:
+        return account.get('polling_interval') or config.polling_interval
+    
+    def interval(self, account: dict, config: MonitoringConfig, now: float) -> float:
+        """Seconds until the account's next check, before jitter"""
+        state = self._states[account['id']]
+        interval = self.base_interval(account, config)
+        if state['failures']:
+            # Backoff wins over hot mode: a failing login will not succeed faster
+            return min(interval * 2 ** state['failures'], max(interval, config.max_backoff_interval))
+        if state['hot_until'] > now:
+            interval = min(interval, account.get('hot_polling_interval') or config.hot_polling_interval)
+        return interval
+    
+    def due(self, accounts: List[dict], now: float) -> List[dict]:
+        return [account for account in accounts if self._states[account['id']]['next_due'] <= now]
+    
+    def record(self, account: dict, config: MonitoringConfig, found: Optional[int], now: float):
+        """Plan the next check from this one's outcome (found is None on failure)"""
+        state = self._states.get(account['id'])
+        if state is None:
+            return  # Deactivated or deleted while it was being checked
+        if found is None:
+            state['failures'] += 1
+        else:
+            if state['failures']:
+                logger.info(f"[{account['name']}] Recovered after {state['failures']} failed checks")
+            state['failures'] = 0
+            if found:
+                state['hot_until'] = now + config.hot_mode_duration
+        interval = self.interval(account, config, now)
+        state.update(planned_at=now, interval=interval)
+        state['next_due'] = now + interval * random.uniform(1 - SCHEDULE_JITTER, 1 + SCHEDULE_JITTER)
+        if state['failures']:
+            logger.info(f"[{account['name']}] {state['failures']} consecutive failures, next check in {interval:.0f}s")
+        if state['next_due'] < self._wake_at:
+            self.wake.set()
+    
+    def seconds_until_next(self, now: float, exclude: set = frozenset()) -> Optional[float]:
+        """Time to the earliest next check, ignoring accounts already queued or running"""
+        pending = [state['next_due'] for account_id, state in self._states.items() if account_id not in exclude]
+        if not pending:
+            return None
+        return max(0.0, min(pending) - now)
+    
+    async def sleep(self, timeout: float):
+        """Sleep until timeout or until woken"""
+        self._wake_at = asyncio.get_running_loop().time() + max(SCHEDULE_MIN_SLEEP, timeout)
+        self.wake.clear()
+        try:
+            await asyncio.wait_for(self.wake.wait(), max(SCHEDULE_MIN_SLEEP, timeout))
+        except asyncio.TimeoutError:
+            pass
+
+# Shared with the lease heartbeat, which wakes it when this worker's accounts change
+polling_scheduler = PollingScheduler()
+
+async def monitoring_loop():
+    """Background monitoring loop: feeds each leased account to the polling workers when it is due"""
+    loop = asyncio.get_running_loop()
+    scheduler = polling_scheduler
+    due_queue: asyncio.Queue = asyncio.Queue()
+    queued: set[str] = set()  # Accounts waiting in due_queue or being checked
+    pool_size = 0
+    workers: set[asyncio.Task] = set()
+    idle_watchers: dict[str, tuple] = {}
+    idle_overflow = 0  # Accounts polled because every IDLE session slot is taken
+    
+    async def polling_worker():
+        while (job := await due_queue.get()) is not None:
+            account, config = job
+            try:
+                if not account_leases.owns(account['id']):
+                    continue  # Handed to another worker while queued
+                found = None
+                try:
+                    found = await check_netflix_emails_for_account(account, config.auto_click)
+                    await increment_stats({}, **{"monitor.last_check": datetime.now(timezone.utc).isoformat()})
+                except Exception as e:
+                    logger.error(f"Unhandled error checking {account.get('name', 'unknown')}: {e}")
+                scheduler.record(account, config, found, loop.time())
+            finally:
+                queued.discard(account['id'])
+    
+    try:
+        while is_monitoring:
+            config = await config_registry.config()
+            owned = account_leases.owned()
+            accounts = [account for account in await config_registry.accounts() if account['id'] in owned]
+            
+            if config.monitoring_mode == "idle":
+                overflow = sync_idle_watchers(idle_watchers, accounts)
+                if len(overflow) != idle_overflow:
+                    idle_overflow = len(overflow)
+                    if overflow:
+                        message = (f"{len(overflow)} accounts exceed IMAP_MAX_IDLE_SESSIONS "
+                                   f"({IMAP_MAX_IDLE_SESSIONS}) and are polled instead")
+                        logger.warning(message)
+                        await add_log("WARNING", message)
+                # Poll only the accounts whose servers cannot push or that have no IDLE session
+                poll_accounts = [acc for acc in accounts if acc['id'] in idle_unsupported] + overflow
+            else:
+                sync_idle_watchers(idle_watchers, [])
+                idle_overflow = 0
+                poll_accounts = accounts
+            
+            # Surplus workers exit after their current check
+            for _ in range(pool_size - config.max_concurrent_checks):
+                due_queue.put_nowait(None)
+            for _ in range(config.max_concurrent_checks - pool_size):
+                task = asyncio.create_task(polling_worker())
+                workers.add(task)
+                task.add_done_callback(workers.discard)
+            pool_size = config.max_concurrent_checks
+            
+            now = loop.time()
+            scheduler.sync(poll_accounts, config, now)
+            for account in scheduler.due(poll_accounts, now):
+                if account['id'] not in queued:
+                    queued.add(account['id'])
+                    due_queue.put_nowait((account, config))
+            
+            # Wake for the next due account; account and config changes wake the scheduler themselves
+            until_next = scheduler.seconds_until_next(loop.time(), exclude=queued)
+            await scheduler.sleep(config.polling_interval if until_next is None else min(until_next, config.polling_interval))
+    finally:
+        sync_idle_watchers(idle_watchers, [])
+        # Checks already running finish; queued ones are dropped
+        workers_left = pool_size
+        while not due_queue.empty():
+            job = due_queue.get_nowait()
+            if job is None:
+                workers_left += 1  # A surplus worker that has not exited yet
+            else:
+                queued.discard(job[0]['id'])
+        for _ in range(workers_left):
+            due_queue.put_nowait(None)
+
+
+# ============ Cluster Coordination ============
+
+CLUSTER_STATE_ID = "monitoring"
+
+class AccountLeases:
+    """Leases in account_leases that split the active accounts between live workers
+    
+    Every worker heartbeats into `workers` and holds at most its fair share,
+    ceil(active accounts / live workers). A lease that is not renewed within
+    LEASE_TTL seconds can be taken by anyone, so a dead worker's accounts move
+    on within one TTL plus one heartbeat.
+    """
+    
+    def __init__(self, worker_id: str = WORKER_ID, ttl: int = LEASE_TTL):
+        self.worker_id = worker_id
+        self.ttl = ttl
+        self.held: set[str] = set()
+        self._renewed_at: Optional[float] = None
+    
+    def owned(self) -> set[str]:
+        """Accounts this worker may check; none once its leases may have lapsed unrenewed"""
+        if self._renewed_at is None or time.monotonic() - self._renewed_at >= self.ttl:
+            return set()
+        return self.held
+    
+    def owns(self, account_id: str) -> bool:
+        return account_id in self.owned()
+    
+    async def heartbeat(self) -> int:
+        """Announce this worker and return how many workers are alive"""
+        now = datetime.now(timezone.utc)
+        await db.workers.update_one(
+            {"_id": self.worker_id},
+            {"$set": {"expires_at": now + timedelta(seconds=self.ttl), "heartbeat_at": now.isoformat()}},
+            upsert=True
+        )
+        return await db.workers.count_documents({"expires_at": {"$gt": now}})
+    
+    async def _renew(self, now: datetime):
+        """Extend every lease still held and forget the ones taken over meanwhile"""
+        renewed_at = time.monotonic()
+        await db.account_leases.update_many(
+            {"owner": self.worker_id, "expires_at": {"$gt": now}},
+            {"$set": {"expires_at": now + timedelta(seconds=self.ttl)}}
+        )
+        self.held = set(await db.account_leases.distinct("_id", {"owner": self.worker_id, "expires_at": {"$gt": now}}))
+        self._renewed_at = renewed_at
+    
+    async def _acquire(self, account_id: str, now: datetime) -> bool:
+        try:
+            await db.account_leases.update_one(
+                {"_id": account_id, "$or": [{"owner": self.worker_id}, {"expires_at": {"$lte": now}}]},
+                {"$set": {"owner": self.worker_id, "expires_at": now + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False  # Another worker holds a live lease
+        self.held.add(account_id)
+        return True
+    
+    async def release(self, account_ids):
+        account_ids = set(account_ids)
+        await db.account_leases.delete_many({"_id": {"$in": sorted(account_ids)}, "owner": self.worker_id})
+        self.held -= account_ids
+    
+    async def rebalance(self, active_ids: List[str], busy: set) -> bool:
+        """Renew, then grow or shrink towards the fair share; returns whether the held set changed"""
+        workers = await self.heartbeat()
+        now = datetime.now(timezone.utc)
+        before = set(self.held)
+        await self._renew(now)
         
-        await asyncio.sleep(polling_interval)
+        active = set(active_ids)
+        if self.held - active:
+            await self.release(self.held - active)
+        share = math.ceil(len(active) / max(workers, 1))
+        if len(self.held) > share:
+            # Surplus goes back for newly started workers; accounts mid-check are kept until next time
+            idle = [account_id for account_id in self.held if account_id not in busy]
+            await self.release(idle[:len(self.held) - share])
+        elif len(self.held) < share:
+            taken = set(await db.account_leases.distinct(
+                "_id", {"_id": {"$in": sorted(active - self.held)}, "expires_at": {"$gt": now}}
+            ))
+            free = list(active - self.held - taken)
+            random.shuffle(free)  # Workers growing at the same time mostly pick different accounts
+            for account_id in free:
+                if len(self.held) >= share:
+                    break
+                await self._acquire(account_id, now)
+        return self.held != before
+    
+    async def release_all(self):
+        """Hand every account over right away on a clean shutdown"""
+        await db.account_leases.delete_many({"owner": self.worker_id})
+        await db.workers.delete_one({"_id": self.worker_id})
+        self.held = set()
+
+account_leases = AccountLeases()
+leased_accounts.set_function(lambda: len(account_leases.owned()))
+
+async def get_cluster_state() -> dict:
+    return await db.cluster_state.find_one({"_id": CLUSTER_STATE_ID}) or {}
+
+async def set_monitoring_enabled(enabled: bool) -> bool:
+    """Turn monitoring on or off for every worker; returns whether it changed"""
+    previous = await db.cluster_state.find_one_and_update(
+        {"_id": CLUSTER_STATE_ID},
+        {"$set": {"enabled": enabled, "updated_at": datetime.now(timezone.utc).isoformat(), "updated_by": WORKER_ID}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    follow_monitoring_state(enabled)
+    return (previous or {}).get("enabled", False) != enabled
+
+def follow_monitoring_state(enabled: bool):
+    """Start or stop this worker's monitoring loop to match the cluster-wide flag"""
+    global is_monitoring, monitoring_task
+    if enabled and not is_monitoring:
+        is_monitoring = True
+        # A loop that was stopped but is still asleep picks up again on its own
+        if monitoring_task is None or monitoring_task.done():
+            monitoring_task = asyncio.create_task(monitoring_loop())
+    elif not enabled and is_monitoring:
+        is_monitoring = False
+        polling_scheduler.wake.set()
+
+# Last manual check request seen; check-now on any worker bumps check_generation
+seen_check_generation: Optional[int] = None
+
+async def request_cluster_check():
+    """Ask every other worker to check its leased accounts now"""
+    global seen_check_generation
+    state = await db.cluster_state.find_one_and_update(
+        {"_id": CLUSTER_STATE_ID},
+        {"$inc": {"check_generation": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    seen_check_generation = state['check_generation']
+
+# Fire-and-forget tasks started by cluster coordination, referenced until they finish
+cluster_tasks: set[asyncio.Task] = set()
+lease_lock = asyncio.Lock()  # The heartbeat and check-now may rebalance at the same time
+
+def spawn_cluster_task(coro):
+    task = asyncio.create_task(coro)
+    cluster_tasks.add(task)
+    task.add_done_callback(cluster_tasks.discard)
+
+async def rebalance_leases() -> int:
+    """Renew this worker's leases and move towards its fair share; returns the active account count"""
+    async with lease_lock:
+        active_ids = [account['id'] for account in await config_registry.accounts()]
+        held_before = set(account_leases.held)
+        if await account_leases.rebalance(active_ids, active_checks | pending_saves.keys()):
+            logger.info(f"Worker {WORKER_ID} now leases {len(account_leases.held)} of {len(active_ids)} accounts")
+            # Close sessions of accounts handed over, deleted or deactivated, so a mailbox
+            # is not logged in from every worker; the monitoring loop stops their IDLE watchers
+            for account_id in held_before - account_leases.held:
+                spawn_cluster_task(imap_pool.evict(account_id))
+            polling_scheduler.wake.set()
+        return len(active_ids)
+
+async def cluster_loop():
+    """Renew and rebalance leases, and follow state that other workers change
+    
+    Covers the monitoring flag, manual check requests, and stats or email log
+    changes that need this worker's SSE clients and page cache refreshed.
+    """
+    global seen_check_generation
+    last_stats, last_active = None, None
+    while True:
+        try:
+            active = await rebalance_leases()
+            
+            state = await get_cluster_state()
+            follow_monitoring_state(state.get("enabled", False))
+            generation = state.get("check_generation", 0)
+            if seen_check_generation is not None and generation != seen_check_generation:
+                spawn_cluster_task(check_all_accounts())
+            seen_check_generation = generation
+            
+            stats = await db.stats_counters.find_one({"_id": STATS_ID})
+            if last_stats is not None and (stats != last_stats or active != last_active):
+                if (stats or {}).get("email_logs_version") != (last_stats or {}).get("email_logs_version"):
+                    email_page_cache.invalidate()
+                event_broker.stats_changed()
+            last_stats, last_active = stats, active
+        except Exception as e:
+            logger.error(f"Lease heartbeat failed: {e}")
+        await asyncio.sleep(LEASE_RENEW_INTERVAL)
+
+class LogSink:
+    """Buffers activity log entries and writes them with insert_many
+    
+    A batch is written once LOG_FLUSH_SIZE entries are waiting or the oldest has
+    waited LOG_FLUSH_INTERVAL seconds. When LOG_BUFFER_SIZE entries are pending,
+    writers wait for room instead of growing the buffer.
+    """
+    
+    def __init__(self, buffer_size: int = LOG_BUFFER_SIZE, flush_size: int = LOG_FLUSH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    def qsize(self) -> int:
+        return self._queue.qsize()
+    
+    async def write(self, doc: dict):
+        self.start()
+        await self._queue.put(doc)
+    
+    async def flush(self):
+        """Wait until everything buffered so far has been written"""
+        if self._task is not None:
+            await self._queue.join()
+    
+    async def stop(self):
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.flush_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+    
+    async def _write(self, batch: List[dict]):
+        try:
+            with log_write_duration.time():
+                await db.logs.insert_many(batch, ordered=False)
+        except Exception as e:
+            logger.error(f"Error writing {len(batch)} activity log entries: {e}")
+
+log_sink = LogSink()
+log_buffer_depth.set_function(log_sink.qsize)
 
 async def add_log(level: str, message: str):
     """Add a log entry to database"""
     log_entry = LogEntry(level=level, message=message)
     doc = log_entry.model_dump()
     doc['timestamp'] = doc['timestamp'].isoformat()
-    await db.logs.insert_one(doc)
+    event_broker.publish("log", doc)
+    doc['created_at'] = log_entry.timestamp  # BSON date for the TTL index
+    await log_sink.write(doc)
+
+
+# ============ Event Stream ============
+
+SSE_HEARTBEAT_INTERVAL = 15  # Seconds between keepalive comments so proxies keep the stream open
+SSE_QUEUE_SIZE = 500  # Events buffered per client before it is dropped and left to reconnect
+STATS_PUSH_DELAY = 0.5  # Stats changes within this window are pushed as one event
+
+class EventBroker:
+    """Fan-out of dashboard events to Server-Sent Events subscribers
+    
+    Events: stats, log, email, email_update, logs_cleared, emails_cleared.
+    """
+    
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._subscribers: set[asyncio.Queue] = set()
+        self._stats_task: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._subscribers)
+    
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(queue)
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+    
+    def _disconnect(self, queue: asyncio.Queue):
+        """End a subscriber's stream; queued events are dropped"""
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+    
+    def publish(self, event: str, data: dict):
+        if not self._subscribers:
+            return
+        message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client this far behind reconnects and reloads instead
+                self._disconnect(queue)
+    
+    def stats_changed(self):
+        """Schedule one stats event for every change within STATS_PUSH_DELAY"""
+        if self._subscribers and (self._stats_task is None or self._stats_task.done()):
+            self._stats_task = asyncio.create_task(self._push_stats())
+    
+    async def _push_stats(self):
+        await asyncio.sleep(STATS_PUSH_DELAY)
+        try:
+            self.publish("stats", await get_stats())
+        except Exception as e:
+            logger.error(f"Error pushing stats: {e}")
+    
+    def close(self):
+        if self._stats_task:
+            self._stats_task.cancel()
+        for queue in list(self._subscribers):
+            self._disconnect(queue)
+
+event_broker = EventBroker()
+event_subscribers.set_function(lambda: len(event_broker))
+
+
+# ============ Pagination ============
+
+def encode_cursor(sort_value: str, doc_id: str) -> str:
+    """Opaque cursor for the position after (sort_value, id)"""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, doc_id]).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    """(sort_value, id) from encode_cursor; both must be strings so a crafted cursor cannot inject query operators"""
+    try:
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(sort_value, str) or not isinstance(doc_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_value, doc_id
+
+def date_range_filter(since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """Range on an ISO-8601 UTC string field; naive datetimes are taken as UTC"""
+    bounds = {}
+    for operator, value in (("$gte", since), ("$lt", until)):
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            bounds[operator] = value.astimezone(timezone.utc).isoformat()
+    return bounds
+
+def email_log_query(email_type: Optional[str], account_id: Optional[str], status: Optional[str],
+                    since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """MongoDB filter for the /api/emails query parameters"""
+    query = {}
+    if email_type:
+        query["email_type"] = email_type
+    if account_id:
+        query["account_id"] = account_id
+    if status:
+        query["status"] = status
+    processed_range = date_range_filter(since, until)
+    if processed_range:
+        query["processed_at"] = processed_range
+    return query
+
+async def keyset_page(collection, query: dict, sort_field: str, limit: int, cursor: Optional[str],
+                      projection: dict) -> Page:
+    """Newest-first page ordered by (sort_field, id), continuing after cursor"""
+    if cursor:
+        sort_value, doc_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {sort_field: {"$lt": sort_value}},
+            {sort_field: sort_value, "id": {"$lt": doc_id}}
+        ]}]}
+    docs = await collection.find(query, projection).sort([(sort_field, -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return Page(items=docs)
+    docs = docs[:limit]
+    return Page(items=docs, next_cursor=encode_cursor(docs[-1][sort_field], docs[-1]['id']))
 
 
 # ============ API Routes ============
@@ -486,16 +2550,19 @@ async def create_account(account: IMAPAccountCreate):
     doc['created_at'] = doc['created_at'].isoformat()
     doc['updated_at'] = doc['updated_at'].isoformat()
     await db.imap_accounts.insert_one(doc)
+    config_registry.invalidate_accounts()
+    event_broker.stats_changed()
     return IMAPAccountResponse(**doc)
 
-@api_router.get("/accounts", response_model=List[IMAPAccountResponse])
-async def get_accounts():
-    """Get all IMAP accounts"""
-    accounts = await db.imap_accounts.find({}, {"_id": 0}).to_list(100)
-    # Mask passwords
-    for acc in accounts:
-        acc['password'] = '********'
-    return [IMAPAccountResponse(**acc) for acc in accounts]
+@api_router.get("/accounts", response_model=AccountPage)
+async def get_accounts(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None
+):
+    """Get IMAP accounts, newest first, one page at a time (passwords are never returned)"""
+    query = {} if is_active is None else {"is_active": is_active}
+    return await keyset_page(db.imap_accounts, query, "created_at", limit, cursor, {"_id": 0, "password": 0})
 
 @api_router.get("/accounts/{account_id}", response_model=IMAPAccountResponse)
 async def get_account(account_id: str):
@@ -520,6 +2587,15 @@ async def update_account(account_id: str, account: IMAPAccountCreate):
     update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
     
     await db.imap_accounts.update_one({"id": account_id}, {"$set": update_data})
+    config_registry.invalidate_accounts()
+    await imap_pool.evict(account_id)
+    event_broker.stats_changed()
+    idle_unsupported.discard(account_id)
+    
+    # A different mailbox means the stored UID high-water mark no longer applies
+    mailbox_keys = ('email', 'imap_server', 'imap_port')
+    if any(update_data[key] != existing.get(key) for key in mailbox_keys):
+        await db.imap_sync_state.delete_one({"account_id": account_id})
     
     # Update account_name in all email_logs for this account
     if update_data['name'] != existing.get('name'):
@@ -527,6 +2603,8 @@ async def update_account(account_id: str, account: IMAPAccountCreate):
             {"account_id": account_id},
             {"$set": {"account_name": update_data['name']}}
         )
+        await email_logs_changed()
+        forget_account_metrics(existing['name'])
         await add_log("INFO", f"Updated account name from '{existing.get('name')}' to '{update_data['name']}'")
     
     updated = await db.imap_accounts.find_one({"id": account_id}, {"_id": 0})
@@ -535,9 +2613,15 @@ async def update_account(account_id: str, account: IMAPAccountCreate):
 @api_router.delete("/accounts/{account_id}")
 async def delete_account(account_id: str):
     """Delete IMAP account"""
-    result = await db.imap_accounts.delete_one({"id": account_id})
-    if result.deleted_count == 0:
+    deleted = await db.imap_accounts.find_one_and_delete({"id": account_id}, {"_id": 0, "name": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Account not found")
+    config_registry.invalidate_accounts()
+    forget_account_metrics(deleted['name'])
+    event_broker.stats_changed()
+    await imap_pool.evict(account_id)
+    idle_unsupported.discard(account_id)
+    await db.imap_sync_state.delete_one({"account_id": account_id})
     return {"message": "Account deleted"}
 
 @api_router.post("/accounts/{account_id}/test")
@@ -548,9 +2632,8 @@ async def test_account_connection(account_id: str):
         raise HTTPException(status_code=404, detail="Account not found")
     
     try:
-        mail = connect_imap(account)
-        mail.select('INBOX')
-        mail.logout()
+        async with AsyncIMAPClient(account) as mail:
+            await mail.select('INBOX')
         await add_log("INFO", f"[{account['name']}] Connection test successful")
         return {"success": True, "message": "Connection successful"}
     except Exception as e:
@@ -561,10 +2644,8 @@ async def test_account_connection(account_id: str):
 @api_router.get("/config/monitoring")
 async def get_monitoring_config():
     """Get monitoring configuration"""
-    config = await db.monitoring_config.find_one({}, {"_id": 0})
-    if not config:
-        return {"polling_interval": 60, "auto_click": True}
-    return config
+    config = await config_registry.config()
+    return config.model_dump()
 
 @api_router.post("/config/monitoring")
 async def update_monitoring_config(config: MonitoringConfig):
@@ -574,18 +2655,39 @@ async def update_monitoring_config(config: MonitoringConfig):
         await db.monitoring_config.update_one({}, {"$set": config.model_dump()})
     else:
         await db.monitoring_config.insert_one(config.model_dump())
+    config_registry.invalidate_config()
     return config
 
 # Email Logs Routes (Public for guests)
-@api_router.get("/emails", response_model=List[dict])
-async def get_email_logs(limit: int = 100, email_type: Optional[str] = None):
-    """Get email logs history - accessible to guests"""
-    query = {}
-    if email_type:
-        query["email_type"] = email_type
+@api_router.get("/emails", response_model=Page)
+async def get_email_logs(
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    email_type: Optional[str] = None,
+    account_id: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Get email logs history, newest first, one page at a time - accessible to guests
+    
+    Pages are served from email_page_cache with a strong ETag; If-None-Match gets a 304.
+    """
+    key = tuple(sorted(request.query_params.multi_items()))
+    cached = email_page_cache.get(key)
+    if cached is None:
+        version = email_page_cache.version
+        query = email_log_query(email_type, account_id, status, since, until)
+        page = await keyset_page(db.email_logs, query, "processed_at", limit, cursor, {"_id": 0, "raw_body": 0})
+        body = json.dumps(jsonable_encoder(page), separators=(',', ':')).encode()
+        cached = email_page_cache.put(key, version, body)
     
-    logs = await db.email_logs.find(query, {"_id": 0, "raw_body": 0}).sort("processed_at", -1).limit(limit).to_list(limit)
-    return logs
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # Always revalidate; a 304 is nearly free
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
 
 @api_router.get("/emails/{email_id}")
 async def get_email_detail(email_id: str):
@@ -599,33 +2701,33 @@ async def get_email_detail(email_id: str):
 async def clear_email_logs():
     """Clear email logs (admin only)"""
     await db.email_logs.delete_many({})
+    seen_message_ids.clear()
+    await rebuild_email_log_counters()
+    await email_logs_changed()
+    event_broker.publish("emails_cleared", {})
     return {"message": "Email logs cleared"}
 
 # Monitoring Routes
 @api_router.get("/monitor/status", response_model=MonitoringStatus)
 async def get_monitoring_status():
     """Get monitoring status"""
-    global is_monitoring, stats
+    monitor = (await get_stats_counters())["monitor"]
     return MonitoringStatus(
-        is_running=is_monitoring,
-        last_check=stats["last_check"],
-        emails_processed=stats["emails_processed"],
-        links_clicked=stats["links_clicked"],
-        errors=stats["errors"]
+        is_running=(await get_cluster_state()).get("enabled", False),
+        last_check=monitor["last_check"],
+        emails_processed=monitor["emails_processed"],
+        links_clicked=monitor["links_clicked"],
+        errors=monitor["errors"]
     )
 
 @api_router.post("/monitor/start")
-async def start_monitoring(background_tasks: BackgroundTasks):
-    """Start background monitoring"""
-    global is_monitoring
-    
-    accounts = await db.imap_accounts.find({"is_active": True}, {"_id": 0}).to_list(100)
-    if not accounts:
+async def start_monitoring():
+    """Start background monitoring on every worker"""
+    if not await config_registry.accounts():
         raise HTTPException(status_code=400, detail="Please add at least one email account first")
     
-    if not is_monitoring:
-        is_monitoring = True
-        background_tasks.add_task(monitoring_loop)
+    if await set_monitoring_enabled(True):
+        event_broker.stats_changed()
         await add_log("INFO", "Monitoring started")
         return {"message": "Monitoring started"}
     
@@ -633,56 +2735,130 @@ async def start_monitoring(background_tasks: BackgroundTasks):
 
 @api_router.post("/monitor/stop")
 async def stop_monitoring():
-    """Stop background monitoring"""
-    global is_monitoring
-    is_monitoring = False
+    """Stop background monitoring on every worker"""
+    await set_monitoring_enabled(False)
+    event_broker.stats_changed()
     await add_log("INFO", "Monitoring stopped")
     return {"message": "Monitoring stopped"}
 
 @api_router.post("/monitor/check-now")
 async def check_now():
-    """Manual check for Netflix emails"""
-    accounts = await db.imap_accounts.find({"is_active": True}, {"_id": 0}).to_list(100)
-    if not accounts:
+    """Manual check for Netflix emails
+    
+    Waits for this worker's accounts; the other workers check theirs within one lease heartbeat.
+    """
+    if not await config_registry.accounts():
         raise HTTPException(status_code=400, detail="Please add at least one email account first")
     
+    # Accounts added since the last heartbeat are not leased by anyone yet
+    try:
+        await rebalance_leases()
+    except Exception as e:
+        logger.error(f"Could not rebalance leases before the manual check: {e}")
+    await request_cluster_check()
     await check_all_accounts()
+    await flush_pending_saves()
     await add_log("INFO", "Manual email check completed")
-    return {"message": "Check completed", "stats": stats}
+    return {"message": "Check completed", "stats": (await get_stats_counters())["monitor"]}
 
 # Activity Logs Routes
-@api_router.get("/logs", response_model=List[dict])
-async def get_activity_logs(limit: int = 100):
-    """Get activity logs"""
-    logs = await db.logs.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
-    return logs
+@api_router.get("/logs", response_model=Page)
+async def get_activity_logs(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    level: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Get activity logs, newest first, one page at a time"""
+    query = {}
+    if level:
+        query["level"] = level.upper()
+    timestamp_range = date_range_filter(since, until)
+    if timestamp_range:
+        query["timestamp"] = timestamp_range
+    
+    return await keyset_page(db.logs, query, "timestamp", limit, cursor, {"_id": 0, "created_at": 0})
 
 @api_router.delete("/logs")
 async def clear_logs():
     """Clear activity logs"""
+    await log_sink.flush()
     await db.logs.delete_many({})
+    event_broker.publish("logs_cleared", {})
     return {"message": "Logs cleared"}
 
+# Admin Routes
+@api_router.get("/admin/indexes")
+async def get_index_usage(username: str = Depends(verify_admin)):
+    """Report declared indexes and their usage counters ($indexStats)"""
+    report = {}
+    for collection_name, models in INDEX_SPECS.items():
+        collection = db[collection_name]
+        usage = {}
+        async for index_stats in collection.aggregate([{"$indexStats": {}}]):
+            usage[index_stats['name']] = {
+                "key": dict(index_stats['key']),
+                "ops": index_stats['accesses']['ops'],
+                "since": index_stats['accesses']['since'].isoformat()
+            }
+        declared = [model.document['name'] for model in models]
+        report[collection_name] = {
+            "declared": declared,
+            "missing": [name for name in declared if name not in usage],
+            "indexes": usage,
+            "documents": await collection.estimated_document_count()
+        }
+    return report
+
 # Stats Routes
+@api_router.get("/events")
+async def stream_events():
+    """Server-Sent Events for the dashboard; replaces polling stats, logs and emails"""
+    queue = event_broker.subscribe()
+    
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            event_broker.unsubscribe(queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # Keep nginx from buffering the stream
+    })
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics: per-stage latency, cycle duration, queue depth, arrival-to-click"""
+    # Rendering walks every series; keep it off the event loop
+    body = await asyncio.get_running_loop().run_in_executor(None, generate_latest)
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
+
 @api_router.get("/stats")
 async def get_stats():
     """Get dashboard statistics"""
-    total_emails = await db.email_logs.count_documents({})
-    clicked_count = await db.email_logs.count_documents({"status": "clicked"})
-    error_count = await db.email_logs.count_documents({"status": "error"})
-    household_count = await db.email_logs.count_documents({"email_type": "household_update"})
-    access_code_count = await db.email_logs.count_documents({"email_type": "temporary_access"})
+    counters = await get_stats_counters()
     active_accounts = await db.imap_accounts.count_documents({"is_active": True})
     
     return {
-        "total_emails": total_emails,
-        "links_clicked": clicked_count,
-        "errors": error_count,
-        "household_emails": household_count,
-        "access_code_emails": access_code_count,
+        "total_emails": counters["total_emails"],
+        "links_clicked": counters["links_clicked"],
+        "errors": counters["errors"],
+        "household_emails": counters["household_emails"],
+        "access_code_emails": counters["access_code_emails"],
         "active_accounts": active_accounts,
-        "is_monitoring": is_monitoring,
-        "last_check": stats["last_check"]
+        "is_monitoring": (await get_cluster_state()).get("enabled", False),
+        "last_check": counters["monitor"]["last_check"]
     }
 
 
@@ -1,9 +1,34 @@
-import { useRef, useEffect } from "react";
+import { useRef, useEffect, useState, useCallback } from "react";
+import axios from "axios";
 import { cn } from "../lib/utils";
 import { ScrollArea } from "./ui/scroll-area";
+import { useEventStream } from "../hooks/use-event-stream";
 
-const LogTerminal = ({ logs = [], className, maxHeight = "300px" }) => {
+const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+
+const LogTerminal = ({ limit = 50, className, maxHeight = "300px" }) => {
   const scrollRef = useRef(null);
+  const [logs, setLogs] = useState([]);
+
+  const fetchLogs = useCallback(async () => {
+    try {
+      const response = await axios.get(`${API}/logs?limit=${limit}`);
+      setLogs(response.data.items);
+    } catch (error) {
+      console.error("Error fetching logs:", error);
+    }
+  }, [limit]);
+
+  useEffect(() => {
+    fetchLogs();
+  }, [fetchLogs]);
+
+  // New entries are pushed as they are written, newest first like /api/logs
+  useEventStream({
+    log: (log) => setLogs((current) => [log, ...current].slice(0, limit)),
+    logs_cleared: () => setLogs([]),
+    reconnect: fetchLogs,
+  });
 
   useEffect(() => {
     if (scrollRef.current) {
@@ -0,0 +1,67 @@
+import { useEffect, useRef } from "react";
+
+const EVENTS_URL = `${process.env.REACT_APP_BACKEND_URL}/api/events`;
+
+// One EventSource per tab, shared by every subscribed component
+let source = null;
+const listeners = new Map(); // event type -> Set of handlers
+
+const dispatch = (type, data) => {
+  (listeners.get(type) || []).forEach((handler) => handler(data));
+};
+
+const attach = (type) => {
+  if (type === "reconnect") return;
+  source.addEventListener(type, (event) => dispatch(type, JSON.parse(event.data)));
+};
+
+const ensureSource = () => {
+  if (source) return;
+  source = new EventSource(EVENTS_URL);
+  // EventSource retries on its own; subscribers reload anything missed while it was down
+  let connected = false;
+  source.onopen = () => {
+    if (connected) dispatch("reconnect");
+    connected = true;
+  };
+  listeners.forEach((_, type) => attach(type));
+};
+
+const subscribe = (type, handler) => {
+  if (!listeners.has(type)) {
+    listeners.set(type, new Set());
+    if (source) attach(type);
+  }
+  listeners.get(type).add(handler);
+  ensureSource();
+
+  return () => {
+    listeners.get(type).delete(handler);
+    if ([...listeners.values()].every((handlers) => handlers.size === 0)) {
+      source.close();
+      source = null;
+      listeners.clear();
+    }
+  };
+};
+
+/**
+ * Subscribe to /api/events. `handlers` maps event types (stats, log, email,
+ * email_update, logs_cleared, emails_cleared, or "reconnect")
+ * to callbacks receiving the parsed event data.
+ */
+export const useEventStream = (handlers) => {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+  const types = Object.keys(handlers).sort().join(",");
+
+  useEffect(() => {
+    const unsubscribers = types
+      .split(",")
+      .filter(Boolean)
+      .map((type) => subscribe(type, (data) => handlersRef.current[type]?.(data)));
+    return () => unsubscribers.forEach((unsubscribe) => unsubscribe());
+  }, [types]);
+};
+
+export default useEventStream;
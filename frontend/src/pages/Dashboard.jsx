@@ -6,6 +6,7 @@ import StatCard from "../components/StatCard";
 import StatusIndicator from "../components/StatusIndicator";
 import LogTerminal from "../components/LogTerminal";
 import { Button } from "../components/ui/button";
+import { useEventStream } from "../hooks/use-event-stream";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
@@ -20,21 +21,18 @@ const Dashboard = () => {
     is_monitoring: false,
     last_check: null,
   });
-  const [logs, setLogs] = useState([]);
   const [recentEmails, setRecentEmails] = useState([]);
   const [loading, setLoading] = useState(false);
   const [checking, setChecking] = useState(false);
 
   const fetchData = useCallback(async () => {
     try {
-      const [statsRes, logsRes, emailsRes] = await Promise.all([
+      const [statsRes, emailsRes] = await Promise.all([
         axios.get(`${API}/stats`),
-        axios.get(`${API}/logs?limit=50`),
         axios.get(`${API}/emails?limit=5`),
       ]);
       setStats(statsRes.data);
-      setLogs(logsRes.data);
-      setRecentEmails(emailsRes.data);
+      setRecentEmails(emailsRes.data.items);
     } catch (error) {
       console.error("Error fetching data:", error);
     }
@@ -42,10 +40,18 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchData();
-    const interval = setInterval(fetchData, 10000);
-    return () => clearInterval(interval);
   }, [fetchData]);
 
+  // Updates are pushed by the server instead of polled
+  useEventStream({
+    stats: setStats,
+    email: (email) => setRecentEmails((emails) => [email, ...emails].slice(0, 5)),
+    email_update: (update) =>
+      setRecentEmails((emails) => emails.map((email) => (email.id === update.id ? { ...email, ...update } : email))),
+    emails_cleared: () => setRecentEmails([]),
+    reconnect: fetchData,
+  });
+
   const handleStartMonitoring = async () => {
     setLoading(true);
     try {
@@ -213,7 +219,7 @@ const Dashboard = () => {
       {/* Main Content Grid */}
       <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
         {/* Activity Log */}
-        <LogTerminal logs={logs} />
+        <LogTerminal />
 
         {/* Recent Emails */}
         <div className="card" data-testid="recent-emails-card">
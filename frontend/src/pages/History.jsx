@@ -13,27 +13,52 @@ import {
 } from "../components/ui/select";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const PAGE_SIZE = 50;
 
 const History = () => {
   const [emails, setEmails] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filter, setFilter] = useState("all");
+  const [statusFilter, setStatusFilter] = useState("all");
+
+  const fetchPage = useCallback(async (cursor) => {
+    const params = { limit: PAGE_SIZE };
+    if (filter !== "all") params.email_type = filter;
+    if (statusFilter !== "all") params.status = statusFilter;
+    if (cursor) params.cursor = cursor;
+    const response = await axios.get(`${API}/emails`, { params });
+    return response.data;
+  }, [filter, statusFilter]);
 
   const fetchEmails = useCallback(async () => {
     setLoading(true);
     try {
-      const url = filter === "all" 
-        ? `${API}/emails?limit=100`
-        : `${API}/emails?limit=100&email_type=${filter}`;
-      const response = await axios.get(url);
-      setEmails(response.data);
+      const page = await fetchPage(null);
+      setEmails(page.items);
+      setNextCursor(page.next_cursor);
     } catch (error) {
       console.error("Error fetching emails:", error);
       toast.error("Failed to load email history");
     } finally {
       setLoading(false);
     }
-  }, [filter]);
+  }, [fetchPage]);
+
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      setEmails((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      console.error("Error fetching emails:", error);
+      toast.error("Failed to load more emails");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   useEffect(() => {
     fetchEmails();
@@ -91,7 +116,7 @@ const History = () => {
               Email History
             </h1>
             <p className="text-[#a3a3a3] text-sm font-mono">
-              {emails.length} NETFLIX EMAILS FOUND
+              {emails.length}{nextCursor ? "+" : ""} NETFLIX EMAILS FOUND
             </p>
           </div>
         </div>
@@ -109,6 +134,17 @@ const History = () => {
                 <SelectItem value="temporary_access" className="text-white hover:bg-[#262626]">Temporary Access</SelectItem>
               </SelectContent>
             </Select>
+            <Select value={statusFilter} onValueChange={setStatusFilter}>
+              <SelectTrigger className="w-[150px] bg-[#121212] border-[#262626] text-white" data-testid="email-status-filter">
+                <SelectValue placeholder="Filter by status" />
+              </SelectTrigger>
+              <SelectContent className="bg-[#0A0A0A] border-[#262626]">
+                <SelectItem value="all" className="text-white hover:bg-[#262626]">Any Status</SelectItem>
+                <SelectItem value="clicked" className="text-white hover:bg-[#262626]">Clicked</SelectItem>
+                <SelectItem value="detected" className="text-white hover:bg-[#262626]">Detected</SelectItem>
+                <SelectItem value="error" className="text-white hover:bg-[#262626]">Error</SelectItem>
+              </SelectContent>
+            </Select>
           </div>
 
           <Button
@@ -217,11 +253,25 @@ const History = () => {
                     {email.click_response && (
                       <p className="text-xs text-[#a3a3a3] font-mono">
                         Response: {email.click_response}
+                        {email.click_latency_ms != null && ` (${Math.round(email.click_latency_ms)} ms)`}
+                        {email.detected_to_clicked_ms != null && ` · clicked ${Math.round(email.detected_to_clicked_ms)} ms after detection`}
                       </p>
                     )}
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <Button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  variant="outline"
+                  className="btn-secondary w-full flex items-center justify-center gap-2"
+                  data-testid="load-more-history-btn"
+                >
+                  <RefreshCw className={`w-4 h-4 ${loadingMore ? "animate-spin" : ""}`} />
+                  Load More
+                </Button>
+              )}
             </div>
           </ScrollArea>
         )}
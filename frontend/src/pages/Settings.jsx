@@ -1,11 +1,18 @@
 import { useState, useEffect } from "react";
-import { Settings as SettingsIcon, Save, TestTube, Trash2, Eye, EyeOff, Plus, Mail, Power, PowerOff } from "lucide-react";
+import { Settings as SettingsIcon, Save, TestTube, Trash2, Eye, EyeOff, Plus, Mail, Power, PowerOff, RefreshCw } from "lucide-react";
 import { toast } from "sonner";
 import axios from "axios";
 import { Button } from "../components/ui/button";
 import { Input } from "../components/ui/input";
 import { Label } from "../components/ui/label";
 import { Switch } from "../components/ui/switch";
+import {
+  Select,
+  SelectContent,
+  SelectItem,
+  SelectTrigger,
+  SelectValue,
+} from "../components/ui/select";
 import {
   Dialog,
   DialogContent,
@@ -15,12 +22,20 @@ import {
 } from "../components/ui/dialog";
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
+const ACCOUNTS_PAGE_SIZE = 50;
 
 const Settings = () => {
   const [accounts, setAccounts] = useState([]);
+  const [accountsCursor, setAccountsCursor] = useState(null);
+  const [loadingMoreAccounts, setLoadingMoreAccounts] = useState(false);
   const [monitoringConfig, setMonitoringConfig] = useState({
     polling_interval: 60,
     auto_click: true,
+    max_concurrent_checks: 10,
+    monitoring_mode: "polling",
+    hot_polling_interval: 10,
+    hot_mode_duration: 900,
+    max_backoff_interval: 1800,
   });
   const [loading, setLoading] = useState(false);
   const [dialogOpen, setDialogOpen] = useState(false);
@@ -33,6 +48,8 @@ const Settings = () => {
     imap_server: "imap.gmail.com",
     imap_port: 993,
     is_active: true,
+    polling_interval: null,
+    hot_polling_interval: null,
   });
 
   useEffect(() => {
@@ -40,12 +57,34 @@ const Settings = () => {
     fetchMonitoringConfig();
   }, []);
 
+  const fetchAccountsPage = async (cursor) => {
+    const params = { limit: ACCOUNTS_PAGE_SIZE };
+    if (cursor) params.cursor = cursor;
+    const response = await axios.get(`${API}/accounts`, { params });
+    return response.data;
+  };
+
   const fetchAccounts = async () => {
     try {
-      const response = await axios.get(`${API}/accounts`);
-      setAccounts(response.data);
+      const page = await fetchAccountsPage(null);
+      setAccounts(page.items);
+      setAccountsCursor(page.next_cursor);
+    } catch (error) {
+      console.error("Error fetching accounts:", error);
+    }
+  };
+
+  const loadMoreAccounts = async () => {
+    setLoadingMoreAccounts(true);
+    try {
+      const page = await fetchAccountsPage(accountsCursor);
+      setAccounts((current) => [...current, ...page.items]);
+      setAccountsCursor(page.next_cursor);
     } catch (error) {
       console.error("Error fetching accounts:", error);
+      toast.error("Failed to load more accounts");
+    } finally {
+      setLoadingMoreAccounts(false);
     }
   };
 
@@ -141,6 +180,8 @@ const Settings = () => {
       imap_server: "imap.gmail.com",
       imap_port: 993,
       is_active: true,
+      polling_interval: null,
+      hot_polling_interval: null,
     });
     setEditingAccount(null);
     setShowPassword(false);
@@ -155,6 +196,8 @@ const Settings = () => {
       imap_server: account.imap_server,
       imap_port: account.imap_port,
       is_active: account.is_active,
+      polling_interval: account.polling_interval,
+      hot_polling_interval: account.hot_polling_interval,
     });
     setDialogOpen(true);
   };
@@ -286,6 +329,33 @@ const Settings = () => {
                   </div>
                 </div>
 
+                <div className="grid grid-cols-2 gap-4">
+                  <div className="form-group">
+                    <Label htmlFor="account_polling_interval" className="form-label">Polling Interval (s)</Label>
+                    <Input
+                      id="account_polling_interval"
+                      type="number"
+                      min={5}
+                      placeholder="Default"
+                      value={newAccount.polling_interval ?? ""}
+                      onChange={(e) => setNewAccount({ ...newAccount, polling_interval: e.target.value ? parseInt(e.target.value) : null })}
+                      className="input-field"
+                    />
+                  </div>
+                  <div className="form-group">
+                    <Label htmlFor="account_hot_polling_interval" className="form-label">Hot Interval (s)</Label>
+                    <Input
+                      id="account_hot_polling_interval"
+                      type="number"
+                      min={5}
+                      placeholder="Default"
+                      value={newAccount.hot_polling_interval ?? ""}
+                      onChange={(e) => setNewAccount({ ...newAccount, hot_polling_interval: e.target.value ? parseInt(e.target.value) : null })}
+                      className="input-field"
+                    />
+                  </div>
+                </div>
+
                 <div className="flex justify-end gap-3 pt-4">
                   <Button
                     variant="outline"
@@ -377,6 +447,18 @@ const Settings = () => {
                 </div>
               </div>
             ))}
+            {accountsCursor && (
+              <Button
+                onClick={loadMoreAccounts}
+                disabled={loadingMoreAccounts}
+                variant="outline"
+                className="btn-secondary w-full flex items-center justify-center gap-2"
+                data-testid="load-more-accounts-btn"
+              >
+                <RefreshCw className={`w-4 h-4 ${loadingMoreAccounts ? "animate-spin" : ""}`} />
+                Load More
+              </Button>
+            )}
           </div>
         )}
       </div>
@@ -404,6 +486,62 @@ const Settings = () => {
             />
           </div>
 
+          <div className="form-group">
+            <Label htmlFor="hot_polling_interval" className="form-label">
+              Hot Polling Interval (seconds)
+            </Label>
+            <Input
+              id="hot_polling_interval"
+              type="number"
+              value={monitoringConfig.hot_polling_interval}
+              onChange={(e) => setMonitoringConfig({ ...monitoringConfig, hot_polling_interval: parseInt(e.target.value) })}
+              min={5}
+              max={3600}
+              className="input-field"
+              data-testid="hot-polling-interval-input"
+            />
+            <p className="text-xs text-[#666] mt-1">
+              Used for {Math.round(monitoringConfig.hot_mode_duration / 60)} minutes after a household or access code email; failing accounts back off up to {Math.round(monitoringConfig.max_backoff_interval / 60)} minutes
+            </p>
+          </div>
+
+          <div className="form-group">
+            <Label htmlFor="max_concurrent_checks" className="form-label">
+              Concurrent Account Checks
+            </Label>
+            <Input
+              id="max_concurrent_checks"
+              type="number"
+              value={monitoringConfig.max_concurrent_checks}
+              onChange={(e) => setMonitoringConfig({ ...monitoringConfig, max_concurrent_checks: parseInt(e.target.value) })}
+              min={1}
+              max={100}
+              className="input-field"
+              data-testid="max-concurrent-checks-input"
+            />
+          </div>
+
+          <div className="form-group">
+            <Label htmlFor="monitoring_mode" className="form-label">
+              Monitoring Mode
+            </Label>
+            <Select
+              value={monitoringConfig.monitoring_mode}
+              onValueChange={(value) => setMonitoringConfig({ ...monitoringConfig, monitoring_mode: value })}
+            >
+              <SelectTrigger id="monitoring_mode" className="input-field" data-testid="monitoring-mode-select">
+                <SelectValue placeholder="Select mode" />
+              </SelectTrigger>
+              <SelectContent className="bg-[#0A0A0A] border-[#262626]">
+                <SelectItem value="polling" className="text-white hover:bg-[#262626]">Polling (interval)</SelectItem>
+                <SelectItem value="idle" className="text-white hover:bg-[#262626]">Push (IMAP IDLE)</SelectItem>
+              </SelectContent>
+            </Select>
+            <p className="text-xs text-[#666] mt-1">
+              Push mode detects new emails instantly; servers without IDLE fall back to polling
+            </p>
+          </div>
+
           <div className="form-group flex items-center justify-between p-4 bg-[#121212] border border-[#262626]">
             <div>
               <Label className="form-label mb-0">Auto-Click Household Links</Label>
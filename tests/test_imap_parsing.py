@@ -0,0 +1,195 @@
+import asyncio
+import base64
+
+from server import (MAX_BODY_BYTES, decode_transfer_payload, encoded_length_cap, extract_email_body,
+                    fetch_candidate_bodies, fetch_candidate_headers, find_body_section, parse_fetch_response)
+
+HEADER_FETCH = b'BODY[HEADER.FIELDS (SUBJECT FROM MESSAGE-ID DATE)]'
+
+PLAIN = b'("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 10 1 NIL NIL NIL NIL)'
+HTML_QP = b'("TEXT" "HTML" ("CHARSET" "iso-8859-1") NIL NIL "QUOTED-PRINTABLE" 20 1 NIL NIL NIL NIL)'
+IMAGE = b'("IMAGE" "PNG" ("NAME" "logo.png") NIL NIL "BASE64" 4000 NIL NIL NIL NIL)'
+
+
+def header_item(sequence: int, uid: int, header: bytes) -> list:
+    """One message of a phase 1 FETCH reply, shaped as imaplib returns it"""
+    prefix = (f'{sequence} (UID {uid} INTERNALDATE "17-Jul-2026 02:44:25 -0700" BODYSTRUCTURE '.encode()
+              + PLAIN + b' ' + HEADER_FETCH + f' {{{len(header)}}}'.encode())
+    return [(prefix, header), b')']
+
+def structure_of(bodystructure: bytes) -> list:
+    return parse_fetch_response([b'1 (UID 1 BODYSTRUCTURE ' + bodystructure + b')'])[0]['BODYSTRUCTURE']
+
+
+# ---- parse_fetch_response ----
+
+def test_parse_fetch_response_reads_literals_and_atoms():
+    header = b'Subject: Hi\r\nFrom: info@account.netflix.com\r\n\r\n'
+    [item] = parse_fetch_response(header_item(1, 42, header))
+    assert item['UID'] == b'42'
+    assert item['INTERNALDATE'] == b'17-Jul-2026 02:44:25 -0700'
+    assert item['BODY[HEADER.FIELDS (SUBJECT FROM MESSAGE-ID DATE)]'] == header
+    assert item['BODYSTRUCTURE'][:2] == [b'TEXT', b'PLAIN']
+
+def test_parse_fetch_response_splits_messages():
+    data = header_item(1, 7, b'Subject: a\r\n\r\n') + header_item(2, 9, b'Subject: b\r\n\r\n')
+    assert [item['UID'] for item in parse_fetch_response(data)] == [b'7', b'9']
+
+def test_parse_fetch_response_keeps_unsolicited_flags_separate():
+    data = header_item(1, 7, b'Subject: a\r\n\r\n') + [b'3 (FLAGS (\\Seen))']
+    items = parse_fetch_response(data)
+    assert len(items) == 2
+    assert items[1] == {'FLAGS': [b'\\Seen']}
+
+def test_parse_fetch_response_partial_section_with_trailing_uid():
+    payload = b'<html>body</html>'
+    data = [(b'1 (BODY[1.2]<0> {%d}' % len(payload), payload), b' UID 12)', None]
+    [item] = parse_fetch_response(data)
+    assert item == {'BODY[1.2]<0>': payload, 'UID': b'12'}
+
+def test_parse_fetch_response_quoted_strings_and_nil():
+    [item] = parse_fetch_response([b'1 (UID 3 X-NAME "say \\"hi\\" \\\\ bye" X-EMPTY NIL)'])
+    assert item['X-NAME'] == b'say "hi" \\ bye'
+    assert item['X-EMPTY'] is None
+
+
+# ---- find_body_section ----
+
+def test_find_body_section_single_part():
+    assert find_body_section(structure_of(PLAIN)) == ('1', '7bit', 'us-ascii')
+
+def test_find_body_section_prefers_html():
+    structure = structure_of(b'(' + PLAIN + HTML_QP + b' "ALTERNATIVE" ("BOUNDARY" "b1") NIL NIL)')
+    assert find_body_section(structure) == ('2', 'quoted-printable', 'iso-8859-1')
+
+def test_find_body_section_nested_multipart():
+    alternative = b'(' + PLAIN + HTML_QP + b' "ALTERNATIVE" ("BOUNDARY" "b2") NIL NIL)'
+    structure = structure_of(b'(' + alternative + IMAGE + b' "MIXED" ("BOUNDARY" "b1") NIL NIL)')
+    assert find_body_section(structure) == ('1.2', 'quoted-printable', 'iso-8859-1')
+
+def test_find_body_section_falls_back_to_plain():
+    structure = structure_of(b'(' + PLAIN + IMAGE + b' "MIXED" ("BOUNDARY" "b1") NIL NIL)')
+    assert find_body_section(structure) == ('1', '7bit', 'us-ascii')
+
+def test_find_body_section_without_text_part():
+    structure = structure_of(b'(' + IMAGE + IMAGE + b' "MIXED" ("BOUNDARY" "b1") NIL NIL)')
+    assert find_body_section(structure) is None
+
+def test_find_body_section_defaults_charset():
+    structure = structure_of(b'("TEXT" "HTML" NIL NIL NIL "BASE64" 20 1 NIL NIL NIL NIL)')
+    assert find_body_section(structure) == ('1', 'base64', 'utf-8')
+
+
+# ---- extract_email_body ----
+
+def multipart(boundary: str, parts: list, subtype: str = 'alternative') -> bytes:
+    body = ''.join(f'--{boundary}\r\n{part}\r\n' for part in parts) + f'--{boundary}--\r\n'
+    return f'Content-Type: multipart/{subtype}; boundary="{boundary}"\r\n\r\n{body}'
+
+def test_extract_email_body_single_part():
+    raw = b'Subject: x\r\nContent-Type: text/plain\r\n\r\nHello there\r\n'
+    assert extract_email_body(raw) == 'Hello there\r\n'
+
+def test_extract_email_body_prefers_html():
+    raw = multipart('b1', [
+        'Content-Type: text/plain\r\n\r\nplain text',
+        'Content-Type: text/html\r\n\r\n<p>html</p>',
+    ]).encode()
+    assert extract_email_body(b'Subject: x\r\n' + raw) == '<p>html</p>'
+
+def test_extract_email_body_decodes_base64_and_quoted_printable():
+    encoded = base64.encodebytes('<a href="x">Añadir</a>'.encode()).decode()
+    raw = multipart('b1', [
+        'Content-Type: text/plain; charset=iso-8859-1\r\nContent-Transfer-Encoding: quoted-printable\r\n\r\nA=F1adir',
+        f'Content-Type: text/html; charset=utf-8\r\nContent-Transfer-Encoding: base64\r\n\r\n{encoded}',
+    ]).encode()
+    assert extract_email_body(raw) == '<a href="x">Añadir</a>'
+    plain_only = multipart('b1', [
+        'Content-Type: text/plain; charset=iso-8859-1\r\nContent-Transfer-Encoding: quoted-printable\r\n\r\nA=F1adir',
+    ]).encode()
+    assert extract_email_body(plain_only) == 'Añadir'
+
+def test_extract_email_body_nested_and_attachments_skipped():
+    image = base64.encodebytes(b'\x89PNG' * 100).decode()
+    inner = multipart('b2', [
+        'Content-Type: text/plain\r\n\r\nplain',
+        'Content-Type: text/html\r\n\r\n<b>nested</b>',
+    ])
+    raw = multipart('b1', [
+        f'Content-Type: image/png\r\nContent-Transfer-Encoding: base64\r\n\r\n{image}',
+        inner.rstrip('\r\n'),
+    ], subtype='mixed').encode()
+    assert extract_email_body(raw) == '<b>nested</b>'
+
+def test_extract_email_body_lf_line_endings():
+    raw = multipart('b1', ['Content-Type: text/html\r\n\r\n<p>lf</p>']).replace('\r\n', '\n').encode()
+    assert extract_email_body(raw) == '<p>lf</p>'
+
+def test_extract_email_body_caps_decoded_bytes():
+    raw = b'Content-Type: text/html\r\n\r\n' + b'x' * 1000
+    assert extract_email_body(raw, max_bytes=10) == 'x' * 10
+
+def test_extract_email_body_multipart_without_text_or_boundary():
+    attachments_only = multipart('b1', ['Content-Type: application/pdf\r\n\r\n%PDF'], subtype='mixed').encode()
+    assert extract_email_body(attachments_only) == ''
+    assert extract_email_body(b'Content-Type: multipart/mixed\r\n\r\nno boundary') == ''
+
+
+# ---- decode_transfer_payload ----
+
+def test_decode_transfer_payload_base64_is_lenient():
+    assert decode_transfer_payload(b'PGh0bWw+!aGVsbG8=', 'base64', 'utf-8') == '<html>hello'
+    assert decode_transfer_payload(b'PGh0\r\nbWw+\r\n', 'base64', 'utf-8') == '<html>'
+    # A partial fetch can stop mid group
+    assert decode_transfer_payload(b'PGh0bWw+aGVsbG', 'base64', 'utf-8') == '<html>hell'
+    assert decode_transfer_payload(b'PGh0bWw+a', 'base64', 'utf-8') == '<html>'
+
+class StubMail:
+    """Replies to every UID FETCH with a fixed response"""
+
+    def __init__(self, data: list):
+        self.data = data
+
+    async def uid(self, command: str, *args):
+        return 'OK', self.data
+
+def test_fetch_candidate_headers_skips_unsolicited_fetch_responses():
+    header = b'Subject: Netflix\r\nFrom: info@account.netflix.com\r\nMessage-ID: <a@b>\r\n\r\n'
+    data = header_item(2, 8, header) + [b'3 (FLAGS (\\Seen))'] + header_item(1, 5, header)
+    candidates = asyncio.run(fetch_candidate_headers(StubMail(data), [5, 8]))
+    assert [candidate['uid'] for candidate in candidates] == [5, 8]
+    assert candidates[0]['message_id'] == '<a@b>'
+    assert candidates[0]['section'] == ('1', '7bit', 'us-ascii')
+    assert candidates[0]['arrived_at'].year == 2026
+
+def test_fetch_candidate_headers_ignores_uids_not_requested():
+    data = header_item(1, 5, b'Subject: a\r\n\r\n') + header_item(2, 99, b'Subject: b\r\n\r\n')
+    candidates = asyncio.run(fetch_candidate_headers(StubMail(data), [5]))
+    assert [candidate['uid'] for candidate in candidates] == [5]
+
+
+# ---- fetch_candidate_bodies ----
+
+class RecordingMail:
+    """Answers each UID FETCH with an empty section and records the items asked for"""
+
+    def __init__(self):
+        self.fetched = []
+
+    async def uid(self, command: str, uids: str, items: str):
+        self.fetched.append(items)
+        return 'OK', [(f'{uid} (UID {uid} BODY[1]<0> {{0}}'.encode(), b'') for uid in uids.split(',')] + [b')']
+
+def test_fetch_candidate_bodies_caps_each_transfer_encoding():
+    candidates = [
+        {'uid': 1, 'section': ('1', 'base64', 'utf-8')},
+        {'uid': 2, 'section': ('1', 'quoted-printable', 'utf-8')},
+        {'uid': 3, 'section': ('1', '7bit', 'utf-8')},
+    ]
+    mail = RecordingMail()
+    bodies = asyncio.run(fetch_candidate_bodies(mail, candidates))
+    assert mail.fetched == [
+        f'(UID BODY.PEEK[1]<0.{encoded_length_cap(MAX_BODY_BYTES, encoding)}>)'
+        for encoding in ('base64', 'quoted-printable', '7bit')
+    ]
+    assert bodies[2] == (b'', 'quoted-printable', 'utf-8')
@@ -0,0 +1,32 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from server import decode_cursor, encode_cursor
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+def test_cursor_round_trip():
+    cursor = encode_cursor('2026-07-17T02:44:25+00:00', 'c2f1')
+    assert decode_cursor(cursor) == ('2026-07-17T02:44:25+00:00', 'c2f1')
+
+@pytest.mark.parametrize('value', [
+    [{'$gt': ''}, 'id'],
+    ['2026-07-17', {'$ne': None}],
+    [1, 'id'],
+    ['2026-07-17', None],
+    ['only one'],
+    {'a': 1},
+])
+def test_cursor_rejects_non_string_values(value):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(raw_cursor(value))
+    assert error.value.status_code == 400
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(HTTPException):
+        decode_cursor('not base64 json!')